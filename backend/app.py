@@ -1,49 +1,34 @@
 import os
 import json
-from flask import Flask, request, jsonify
+import time
+from flask import Flask, Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 
 from config import settings
 from services.ingest import extract_text, make_document_id
-from services.chunk_embed import chunk_text, embed_texts, embedding_dim, get_embedder
-from services.qdrant_store import (
-    get_qdrant_client, ensure_collection, upsert_chunks,
-    search_chunks, list_documents, delete_document
-)
-from services.rag import make_answer
+from services.chunk_embed import chunk_text, embed_query, embedding_dim
+from services.qdrant_store import search_chunks, delete_document
+from services.rag import make_answer, stream_answer
 from services.schema_loader import extract_schema_to_yaml
 from services.classifier import classify_query
-from services.sql_service import run_nl_sql
+from services import classifier
+from services.sql_service import run_nl_sql, stream_nl_sql
 from services.schema_manager import load_db_schemas
+from services import resources, document_catalog, bulk_upload, context_builder, vector_replica, schema_catalog, db_pool, semantic_cache, sql_cache, llm_gateway, embed_cache
 from services.prompt_manager import load_prompts, save_prompts
+from services.concurrency import submit_timed, wait_branch
 from s3_client import upload_stream, delete_object
-from db import init_db, Documents, SessionLocal
+from db import Documents, SessionLocal
 from celery_app import celery_app
 from tasks import process_document_task
 
 
 
 
-# ---- App setup ----
-app = Flask(__name__)
-CORS(app)
-
-# ---- Qdrant client & collection ----
-qdrant = get_qdrant_client(
-    url=settings.QDRANT_URL,
-    api_key=settings.QDRANT_API_KEY,
-    timeout=30.0  # increase from default
-
-)
-
-vector_size = embedding_dim(settings.EMBED_MODEL)
-ensure_collection(qdrant, settings.COLLECTION_NAME, vector_size)
-
-# Warm embedder once
-_ = get_embedder(settings.EMBED_MODEL)
-
-# ---- Initialize DB tables ----
-init_db()
+# Routes live on a blueprint; create_app() builds the Flask app. Qdrant, the
+# embedder and the documents DB are created lazily (services.resources) and
+# warmed in the background, so importing this module does no network I/O.
+bp = Blueprint("api", __name__)
 
 
 DB_CONFIGS_PATH = "db_configs.json"
@@ -60,21 +45,71 @@ def save_db_configs(configs):
 
 
 
-@app.get("/health")
+@bp.get("/health")
 def health():
     return jsonify({"ok": True, "collection": settings.COLLECTION_NAME})
 
-@app.get("/list-docs")
+@bp.get("/ready")
+def ready():
+    """
+    Readiness (vs. /health liveness): 200 once Qdrant, the embedder and the
+    documents DB are warm, 503 with per-component status until then.
+    """
+    status = resources.readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@bp.get("/metrics")
+def metrics():
+    return jsonify({
+        "semantic_cache": semantic_cache.stats(),
+        "sql_cache": sql_cache.stats(),
+        "classifier": classifier.stats(),
+        "llm": llm_gateway.stats(),
+        "embed_cache": embed_cache.stats(),
+        "context": context_builder.stats(),
+        "vector_replica": vector_replica.stats(),
+    })
+
+@bp.get("/list-docs")
 def list_docs():
-    docs = list_documents(qdrant, settings.COLLECTION_NAME)
-    return jsonify({"documents": docs})
+    """
+    Query params:
+      - limit: page size (default LIST_DOCS_PAGE_SIZE, max LIST_DOCS_MAX_PAGE_SIZE)
+      - cursor: next_cursor from the previous page
+      - status: comma-separated filter, e.g. "processed,error"
+    Response: {"documents": [ids], "items": [{document_id, filename, status,
+               chunks, created_at}], "next_cursor": str|null}, newest first.
+    """
+    try:
+        limit = int(request.args.get("limit", settings.LIST_DOCS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, settings.LIST_DOCS_MAX_PAGE_SIZE))
+    statuses = [s.strip() for s in request.args.get("status", "").split(",") if s.strip()]
 
-@app.post("/upload-doc")
+    db = SessionLocal()
+    try:
+        items, next_cursor = document_catalog.list_page(
+            db, limit, cursor=request.args.get("cursor"), statuses=statuses
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db.close()
+    return jsonify({
+        "documents": [item["document_id"] for item in items],
+        "items": items,
+        "next_cursor": next_cursor,
+    })
+
+@bp.post("/upload-doc")
 def upload_doc():
     """
     multipart/form-data:
       - file: (pdf/docx/odt/txt)
-      - document_id (optional): custom id; if omitted, derived from filename
+      - document_id (optional): custom id; if omitted, derived from filename.
+        Re-using an existing id re-indexes that document: only changed chunks
+        are embedded, vanished ones are deleted.
     """
     if "file" not in request.files:
         return jsonify({"error": "file missing"}), 400
@@ -91,12 +126,19 @@ def upload_doc():
         # Stream upload to S3 directly
         upload_stream(settings.S3_BUCKET, s3_key, f.stream, content_type=f.mimetype)
 
-        # Insert DB row with pending status into existing public.documents
+        # Insert (or, on re-index, reset) the DB row with pending status in public.documents
         db = SessionLocal()
-        doc = Documents(id=document_id, file_url=f"s3://{settings.S3_BUCKET}/{s3_key}", status="pending", chunks=0)
-        db.add(doc)
-        db.commit()
-        db.close()
+        try:
+            file_url = f"s3://{settings.S3_BUCKET}/{s3_key}"
+            doc = db.get(Documents, document_id)
+            if doc:
+                doc.file_url, doc.status = file_url, "pending"
+            else:
+                db.add(Documents(id=document_id, file_url=file_url, status="pending", chunks=0))
+            db.commit()
+        finally:
+            db.close()
+        semantic_cache.invalidate_document(document_id)
 
         # Enqueue background processing task (use document_id for lookups)
         process_document_task.delay(document_id, document_id, s3_key, f.filename)
@@ -110,11 +152,15 @@ def upload_doc():
         return jsonify({"error": str(e)}), 500
 
 
-@app.post("/upload-docs")
+@bp.post("/upload-docs")
 def upload_docs():
     """
     multipart/form-data:
       - files: multiple files (pdf/docx/odt/txt), up to 100
+
+    Files are uploaded to S3 concurrently, their documents rows written in one
+    statement and processing enqueued as one Celery group. Poll
+    GET /upload-batch/<batch_id> for aggregate progress.
     """
     files = request.files.getlist("files")
     if not files:
@@ -127,31 +173,70 @@ def upload_docs():
         return jsonify({"error": "Too many files. Max 100."}), 400
 
     results = []
+    entries = []
+    for f in files:
+        if not f or not f.filename:
+            results.append({"filename": getattr(f, 'filename', ''), "ok": False, "error": "empty filename"})
+            continue
+        document_id = make_document_id(f.filename)
+        if any(e["document_id"] == document_id for e in entries):
+            results.append({"filename": f.filename, "ok": False, "error": "duplicate file in batch"})
+            continue
+        entries.append({
+            "filename": f.filename, "document_id": document_id, "stream": f.stream,
+            "mimetype": f.mimetype, "s3_key": f"documents/{document_id}/{f.filename}",
+        })
+
+    failed = bulk_upload.upload_all(entries)
+    results.extend(
+        {"filename": e["filename"], "ok": False, "error": failed[e["document_id"]]}
+        for e in entries if e["document_id"] in failed
+    )
+    entries = [e for e in entries if e["document_id"] not in failed]
+    if not entries:
+        return jsonify({"batch_id": None, "results": results})
+
     db = SessionLocal()
     try:
-        for f in files:
-            if not f or not f.filename:
-                results.append({"filename": getattr(f, 'filename', ''), "ok": False, "error": "empty filename"})
-                continue
-
-            document_id = make_document_id(f.filename)
-            s3_key = f"documents/{document_id}/{f.filename}"
-            try:
-                upload_stream(settings.S3_BUCKET, s3_key, f.stream, content_type=f.mimetype)
-                doc = Documents(id=document_id, file_url=f"s3://{settings.S3_BUCKET}/{s3_key}", status="pending", chunks=0)
-                db.add(doc)
-                db.commit()
-                process_document_task.delay(document_id, document_id, s3_key, f.filename)
-                results.append({"filename": f.filename, "ok": True, "document_id": document_id, "status": "processing"})
-            except Exception as exc:
-                db.rollback()
-                results.append({"filename": f.filename, "ok": False, "error": str(exc)})
+        bulk_upload.insert_pending(db, entries)
+    except Exception as exc:
+        db.rollback()
+        results.extend({"filename": e["filename"], "ok": False, "error": str(exc)} for e in entries)
+        return jsonify({"batch_id": None, "results": results}), 500
     finally:
         db.close()
+    for e in entries:
+        semantic_cache.invalidate_document(e["document_id"])
+
+    try:
+        batch_id = bulk_upload.enqueue(process_document_task, entries)
+    except Exception as exc:
+        return jsonify({"error": f"Failed to enqueue processing: {exc}", "results": results}), 500
 
-    return jsonify({"results": results})
+    results.extend(
+        {"filename": e["filename"], "ok": True, "document_id": e["document_id"], "status": "processing"}
+        for e in entries
+    )
+    return jsonify({"batch_id": batch_id, "results": results})
+
+
+@bp.get("/upload-batch/<batch_id>")
+def upload_batch(batch_id):
+    """
+    Aggregate progress of an /upload-docs batch:
+      {"batch_id", "total", "succeeded", "failed", "running", "done", "chunks",
+       "documents": [{document_id, task_state, status, chunks}]}
+    """
+    db = SessionLocal()
+    try:
+        status = bulk_upload.progress(db, celery_app, batch_id)
+    finally:
+        db.close()
+    if status is None:
+        return jsonify({"error": f"Unknown batch '{batch_id}'"}), 404
+    return jsonify(status)
 
-@app.post("/delete-doc")
+@bp.post("/delete-doc")
 def delete_doc():
     """
     JSON:
@@ -163,7 +248,14 @@ def delete_doc():
         return jsonify({"error": "document_id is required"}), 400
 
     # Delete vectors from Qdrant first
-    delete_document(qdrant, settings.COLLECTION_NAME, doc_id)
+    delete_document(resources.get_qdrant(), settings.COLLECTION_NAME, doc_id)
+    semantic_cache.invalidate_document(doc_id)
+    if settings.VECTOR_REPLICA_ENABLED:
+        # tombstone now if no sync is running; otherwise the next sync round catches it
+        try:
+            vector_replica.tombstone([doc_id])
+        except Exception as e:
+            print(f"[Replica] tombstone of {doc_id} failed: {e}")
 
     # Remove S3 object based on stored file_url, then remove DB row
     db = SessionLocal()
@@ -188,7 +280,7 @@ def delete_doc():
 
     return jsonify({"ok": True, "deleted_document_id": doc_id})
 
-@app.post("/add_db")
+@bp.post("/add_db")
 def add_db():
     """
     JSON: {
@@ -206,6 +298,11 @@ def add_db():
         return jsonify({"error": "Database name required"}), 400
 
     configs = load_db_configs()
+    if db_name in configs:
+        # connection details may change; drop the cached schema and pool for the old config
+        schema_catalog.invalidate(configs[db_name])
+        db_pool.close_pool(configs[db_name])
+        semantic_cache.invalidate_db(db_name)
     configs[db_name] = {
         "host": data["host"],
         "port": data["port"],
@@ -218,7 +315,7 @@ def add_db():
     return jsonify({"success": True, "databases": list(configs.keys())})
 
 
-@app.get("/list_dbs")
+@bp.get("/list_dbs")
 def list_dbs():
     """
     Returns list of configured databases
@@ -230,7 +327,7 @@ def list_dbs():
     return jsonify({"databases": list(configs.keys())})
 
 
-@app.post("/delete_db")
+@bp.post("/delete_db")
 def delete_db():
     """
     JSON:
@@ -247,7 +344,10 @@ def delete_db():
     if db_name not in configs:
         return jsonify({"error": f"Database '{db_name}' not found"}), 404
 
-    # remove db
+    # remove db (and its cached schema / connection pool)
+    schema_catalog.invalidate(configs[db_name])
+    db_pool.close_pool(configs[db_name])
+    semantic_cache.invalidate_db(db_name)
     del configs[db_name]
 
     # save updated configs
@@ -255,7 +355,7 @@ def delete_db():
 
     return jsonify({"success": True, "message": f"Database '{db_name}' deleted."})
 
-@app.get("/prompts")
+@bp.get("/prompts")
 def get_prompts():
     """
     Returns all current prompts.
@@ -271,7 +371,7 @@ def get_prompts():
     return jsonify(prompts)
 
 
-@app.post("/update_prompt")
+@bp.post("/update_prompt")
 def update_prompt():
     """
     Updates a specific prompt value.
@@ -301,13 +401,104 @@ def update_prompt():
     prompts = load_prompts()
     prompts[key] = value
     save_prompts(prompts)
+    semantic_cache.clear()  # cached answers were produced with the old prompts
 
     return jsonify({"success": True, "prompts": prompts})
 
 
 
 
-@app.post("/query")
+def _retrieve(q_vec, top_k, filter_doc):
+    return search_chunks(
+        resources.get_qdrant(), settings.COLLECTION_NAME, q_vec,
+        limit=top_k, filter_by_doc=filter_doc, with_vectors=True  # vectors for context_builder's MMR
+    )
+
+
+def _sources(hits):
+    return [
+        {
+            "document_id": h["payload"]["document_id"],
+            "source": h["payload"]["source"],
+            "chunk_index": h["payload"]["chunk_index"],
+            "score": h["score"]
+        } for h in hits
+    ]
+
+
+def _answer(q, hits):
+    """
+    Pack hits into a token-budgeted context and answer from it; no LLM call
+    when nothing relevant was retrieved. Returns (answer, used_hits, report).
+    """
+    contexts, used, report = context_builder.build_context(hits)
+    if not contexts:
+        return context_builder.NO_CONTEXT_ANSWER, used, report
+    return make_answer(settings.OPENAI_API_KEY, settings.OPENAI_MODEL, q, contexts), used, report
+
+
+def _classify_with_retrieval(q, q_vec, configs, top_k, filter_doc):
+    """
+    Speculative retrieval: embed + search while the classifier runs.
+    Returns (decision, rag_future); callers use the hits for RAG / SQL+RAG
+    and cancel the future for SQL.
+    """
+    rag_future = submit_timed(_retrieve, q_vec, top_k, filter_doc)
+    try:
+        schemas = load_db_schemas(configs)   # served from the in-memory schema catalog
+        decision = classify_query(q, schemas, query_vector=q_vec)
+    except Exception:
+        rag_future.cancel()
+        raise
+    return decision, rag_future
+
+
+def _remember(q_vec, scope, payload, started_at):
+    """
+    Store a successful RAG answer in the semantic cache and jsonify it.
+    """
+    if "error" not in payload:
+        semantic_cache.store(q_vec, scope, payload, computed_at=started_at)
+    return jsonify(payload)
+
+
+def _stream_structured(q, db_config, db_name, max_rows):
+    """
+    NDJSON response for a structured query: a header line with the SQL,
+    one {"row": ...} line per row, then a trailer with the row count.
+    """
+    try:
+        plan, batches = stream_nl_sql(q, db_config, max_rows)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        yield json.dumps({"type": "structured", "db": db_name, **plan}, default=str) + "\n"
+        if batches is None:
+            return
+        count = 0
+        truncated = False
+        try:
+            for rows in batches:
+                if count + len(rows) > max_rows:
+                    rows = rows[:max_rows - count]
+                    truncated = True
+                count += len(rows)
+                if rows:
+                    yield "".join(json.dumps({"row": r}, default=str) + "\n" for r in rows)
+                if truncated:
+                    break
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        finally:
+            batches.close()
+        yield json.dumps({"done": True, "row_count": count, "truncated": truncated}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@bp.post("/query")
 def query():
     """
     JSON:
@@ -315,22 +506,35 @@ def query():
       - db_selection: "auto" | "manual"
       - db_name: str (only if manual)
       - top_k, filter_document_id (for RAG)
+      - stream: bool (structured results as NDJSON from a server-side cursor)
+      - max_rows: int (row cap for streamed results, clamped to [1, SQL_STREAM_MAX_ROWS])
     """
     data = request.get_json(force=True)
     q = data.get("query", "").strip()
     db_selection = data.get("db_selection", "auto")
     db_name = data.get("db_name")
+    stream = bool(data.get("stream", False))
+    max_rows = settings.SQL_STREAM_MAX_ROWS
+    if stream and data.get("max_rows") is not None:
+        try:
+            max_rows = int(data["max_rows"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "max_rows must be an integer"}), 400
+        max_rows = max(1, min(max_rows, settings.SQL_STREAM_MAX_ROWS))
+    top_k = int(data.get("top_k", settings.TOP_K))
+    filter_doc = data.get("filter_document_id")
 
     if not q:
         return jsonify({"error": "query is required"}), 400
 
     configs = load_db_configs()
-    schemas = load_db_schemas(configs)   # <-- build schemas
 
     if db_selection == "manual":
-        # user forces DB
+        # user forces DB (structured only: no embedding, no semantic cache)
         if not db_name or db_name not in configs:
             return jsonify({"error": "Invalid db_name"}), 400
+        if stream:
+            return _stream_structured(q, configs[db_name], db_name, max_rows)
         try:
             result = run_nl_sql(q, configs[db_name])
             return jsonify({"type": "structured", "db": db_name, **result})
@@ -338,14 +542,30 @@ def query():
             return jsonify({"error": str(e)}), 500
 
     else:
+        # Semantic cache: near-identical questions in the same scope reuse the
+        # prior RAG answer (the query vector is needed for retrieval anyway)
+        started_at = time.time()
+        q_vec = embed_query(q, settings.EMBED_MODEL)
+        scope = semantic_cache.make_scope(db_selection, db_name, filter_doc, top_k)
+        if not stream:
+            cached = semantic_cache.lookup(q_vec, scope)
+            if cached:
+                response, similarity = cached
+                return jsonify({**response, "cached": True, "cache_similarity": round(similarity, 4)})
+
         # auto → classifier decides if SQL, RAG, or SQL+RAG
-        decision = classify_query(q, schemas)
+        start = time.perf_counter()
+        decision, rag_future = _classify_with_retrieval(q, q_vec, configs, top_k, filter_doc)
+        classify_ms = round((time.perf_counter() - start) * 1000, 1)
         mode = decision.get("mode")
         db_name = decision.get("db_name")
 
         if mode == "SQL":
+            rag_future.cancel()
             if not db_name or db_name not in configs:
                 return jsonify({"error": f"No suitable database found"}), 400
+            if stream:
+                return _stream_structured(q, configs[db_name], db_name, max_rows)
             try:
                 result = run_nl_sql(q, configs[db_name])
                 return jsonify({"type": "structured", "db": db_name, **result})
@@ -357,77 +577,196 @@ def query():
                 return jsonify({"error": f"No suitable database found"}), 400
 
             try:
-                # Step 1 → run SQL query
-                sql_result = run_nl_sql(q, configs[db_name])
-
-                # Step 2 → enrich with RAG
-                top_k = int(data.get("top_k", settings.TOP_K))
-                filter_doc = data.get("filter_document_id")
-                q_vec = embed_texts([q], settings.EMBED_MODEL)[0]
-                hits = search_chunks(
-                    qdrant, settings.COLLECTION_NAME, q_vec,
-                    limit=top_k, filter_by_doc=filter_doc
-                )
-
-                # Step 3 → combine SQL result + documents into one answer
-                combined_answer = make_answer(
-                    settings.OPENAI_API_KEY,
-                    settings.OPENAI_MODEL,
-                    q,
-                    hits      
-                    )
-
-                sources = [
-                    {
-                        "document_id": h["payload"]["document_id"],
-                        "source": h["payload"]["source"],
-                        "chunk_index": h["payload"]["chunk_index"],
-                        "score": h["score"]
-                    } for h in hits
-                ]
-
-                return jsonify({
+                # SQL and RAG branches are independent until make_answer → run them concurrently
+                # (the RAG branch has been running since before classification)
+                sql_start = time.perf_counter()
+                sql_future = submit_timed(run_nl_sql, q, configs[db_name])
+
+                sql_result, sql_ms, sql_err = wait_branch(sql_future, sql_start + settings.SQL_BRANCH_TIMEOUT)
+                hits, rag_ms, rag_err = wait_branch(rag_future, start + settings.RAG_BRANCH_TIMEOUT)
+                if sql_err:
+                    sql_result = {"error": f"SQL branch failed: {sql_err}"}
+                if rag_err:
+                    if sql_err:
+                        return jsonify({"error": f"SQL branch failed: {sql_err}; RAG branch failed: {rag_err}"}), 500
+                    hits = []
+
+                # combine SQL result + documents into one answer
+                answer_start = time.perf_counter()
+                combined_answer, used, packing = _answer(q, hits)
+                now = time.perf_counter()
+
+                response = {
                     "type": "hybrid",
                     "db": db_name,
                     "sql_result": sql_result,
                     "answer": combined_answer,
-                    "sources": sources
-                })
+                    "sources": _sources(used),
+                    "context": packing,
+                    "timings": {
+                        "classify_ms": classify_ms,
+                        "sql_ms": sql_ms,
+                        "rag_ms": rag_ms,
+                        "answer_ms": round((now - answer_start) * 1000, 1),
+                        "total_ms": round((now - start) * 1000, 1),
+                    },
+                }
+                if rag_err:
+                    response["rag_error"] = f"RAG branch failed: {rag_err}"
+                return jsonify(response)
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
         else:  # fallback → RAG
-            top_k = int(data.get("top_k", settings.TOP_K))
-            filter_doc = data.get("filter_document_id")
-
-            q_vec = embed_texts([q], settings.EMBED_MODEL)[0]
-            hits = search_chunks(
-                qdrant, settings.COLLECTION_NAME, q_vec,
-                limit=top_k, filter_by_doc=filter_doc
-            )
-
-            answer = make_answer(
-                settings.OPENAI_API_KEY, settings.OPENAI_MODEL, q, hits
-            )
-
-            sources = [
-                {
-                    "document_id": h["payload"]["document_id"],
-                    "source": h["payload"]["source"],
-                    "chunk_index": h["payload"]["chunk_index"],
-                    "score": h["score"]
-                } for h in hits
-            ]
-
-            return jsonify({
+            hits, _, rag_err = wait_branch(rag_future, start + settings.RAG_BRANCH_TIMEOUT)
+            if rag_err:
+                return jsonify({"error": f"Retrieval failed: {rag_err}"}), 500
+
+            answer, used, packing = _answer(q, hits)
+
+            return _remember(q_vec, scope, {
                 "type": "unstructured",
                 "answer": answer,
-                "sources": sources
-            })
+                "sources": _sources(used),
+                "context": packing,
+            }, started_at)
+
+
+
+
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@bp.post("/query/stream")
+def query_stream():
+    """
+    Server-Sent Events variant of /query (same JSON body, minus stream/max_rows).
+
+    Events, in order:
+      - mode:       {"mode", "db"} once the route is known
+      - result:     structured result (SQL mode)
+      - sources:    chunks used for the answer + context packing report (RAG / SQL+RAG)
+      - token:      {"text"} answer deltas as the model produces them
+      - sql_result: structured result of the SQL branch (SQL+RAG)
+      - cached:     full cached /query response (semantic cache hit)
+      - error:      {"error"}
+      - done:       {}
+    """
+    data = request.get_json(force=True)
+    q = data.get("query", "").strip()
+    db_selection = data.get("db_selection", "auto")
+    db_name = data.get("db_name")
+    top_k = int(data.get("top_k", settings.TOP_K))
+    filter_doc = data.get("filter_document_id")
+
+    if not q:
+        return jsonify({"error": "query is required"}), 400
+
+    configs = load_db_configs()
+    if db_selection == "manual" and (not db_name or db_name not in configs):
+        return jsonify({"error": "Invalid db_name"}), 400
+
+    def generate():
+        if db_selection != "manual":
+            # only RAG answers are cached, and manual selection always runs SQL
+            started_at = time.time()
+            q_vec = embed_query(q, settings.EMBED_MODEL)
+            scope = semantic_cache.make_scope(db_selection, db_name, filter_doc, top_k)
+            cached = semantic_cache.lookup(q_vec, scope)
+            if cached:
+                yield _sse("cached", {**cached[0], "cached": True, "cache_similarity": round(cached[1], 4)})
+                yield _sse("done", {})
+                return
+
+        try:
+            if db_selection == "manual":
+                mode, target_db, rag_future = "SQL", db_name, None
+            else:
+                start = time.perf_counter()
+                decision, rag_future = _classify_with_retrieval(q, q_vec, configs, top_k, filter_doc)
+                mode, target_db = decision.get("mode"), decision.get("db_name")
+            if mode not in ("SQL", "SQL+RAG"):
+                mode, target_db = "RAG", None
+            yield _sse("mode", {"mode": mode, "db": target_db})
+
+            if mode in ("SQL", "SQL+RAG") and target_db not in configs:
+                if rag_future:
+                    rag_future.cancel()
+                yield _sse("error", {"error": "No suitable database found"})
+                return
+
+            if mode == "SQL":
+                if rag_future:
+                    rag_future.cancel()
+                result = run_nl_sql(q, configs[target_db])
+                payload = {"type": "structured", "db": target_db, **result}
+                yield _sse("result", payload)
+                yield _sse("done", {})
+                return
+
+            sql_future = None
+            if mode == "SQL+RAG":
+                sql_start = time.perf_counter()
+                sql_future = submit_timed(run_nl_sql, q, configs[target_db])
+
+            hits, _, rag_err = wait_branch(rag_future, start + settings.RAG_BRANCH_TIMEOUT)
+            if rag_err:
+                yield _sse("error", {"error": f"Retrieval failed: {rag_err}"})
+                hits = []
+            contexts, used, packing = context_builder.build_context(hits)
+            sources = _sources(used)
+            yield _sse("sources", {"sources": sources, "context": packing})
+
+            if contexts:
+                parts = []
+                for delta in stream_answer(settings.OPENAI_API_KEY, settings.OPENAI_MODEL, q, contexts):
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+                answer = "".join(parts)
+            else:
+                answer = context_builder.NO_CONTEXT_ANSWER
+                yield _sse("token", {"text": answer})
+
+            if sql_future is None:
+                payload = {"type": "unstructured", "answer": answer, "sources": sources, "context": packing}
+            else:
+                sql_result, _, sql_err = wait_branch(sql_future, sql_start + settings.SQL_BRANCH_TIMEOUT)
+                if sql_err:
+                    sql_result = {"error": f"SQL branch failed: {sql_err}"}
+                yield _sse("sql_result", {"db": target_db, "sql_result": sql_result})
+                payload = {"type": "hybrid", "db": target_db, "sql_result": sql_result,
+                           "answer": answer, "sources": sources, "context": packing}
+
+            if not rag_err and sql_future is None:
+                semantic_cache.store(q_vec, scope, payload, computed_at=started_at)
+            yield _sse("done", {})
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
+def create_app(warm_up: bool = None) -> Flask:
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(bp)
+    if settings.WARMUP_ON_START if warm_up is None else warm_up:
+        resources.warm_up()
+    if settings.VECTOR_REPLICA_ENABLED:
+        vector_replica.start_sync_thread(
+            resources.get_qdrant, lambda: embedding_dim(settings.EMBED_MODEL)
+        )
+    return app
 
 
+app = create_app()
 
 
 if __name__ == "__main__":
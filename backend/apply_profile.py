@@ -0,0 +1,36 @@
+"""
+Switch the live Qdrant collection to a tuning profile in place.
+
+Usage (from backend/):
+    python apply_profile.py [default|scalar|binary|fast] [--collection NAME]
+
+The profile defaults to QDRANT_PROFILE and the collection to COLLECTION_NAME.
+Qdrant rebuilds the HNSW graph / quantized vectors in the background and keeps
+serving searches meanwhile; set QDRANT_PROFILE to the same value for the API
+and workers so queries use the profile's search params.
+"""
+import argparse
+import sys
+
+from config import settings
+from services.qdrant_store import COLLECTION_PROFILES, apply_profile, get_qdrant_client
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("profile", nargs="?", default=settings.QDRANT_PROFILE, choices=sorted(COLLECTION_PROFILES))
+    parser.add_argument("--collection", default=settings.COLLECTION_NAME)
+    args = parser.parse_args(argv)
+
+    client = get_qdrant_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=60.0)
+    if not client.collection_exists(args.collection):
+        print(f"collection {args.collection!r} does not exist")
+        return 1
+    apply_profile(client, args.collection, args.profile)
+    status = client.get_collection(args.collection).status
+    print(f"{args.collection}: profile {args.profile!r} applied, status {getattr(status, 'value', status)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
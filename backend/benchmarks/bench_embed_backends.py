@@ -0,0 +1,99 @@
+"""
+Throughput and recall parity of an alternative embedding backend vs. PyTorch.
+
+Usage (from backend/):
+    python benchmarks/bench_embed_backends.py <corpus_dir> \
+        [--backend onnx] [--onnx-file onnx/model_qint8_avx512_vnni.onnx] \
+        [--queries queries.txt] [--k 5] [--max-chunks 5000]
+
+The corpus is extracted and chunked exactly like ingestion (extractor
+registry + iter_chunks). Both backends embed every chunk; the script reports
+chunks/sec for each, the cosine between the two vectors of each chunk
+(mean / min), and recall@k of the candidate's top-k against the PyTorch
+top-k for every query. Without --queries, the first sentence of a sample of
+chunks is used as the query set.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+from services.ingest import get_extractor  # noqa: E402
+from services.chunk_embed import iter_chunks, encode_local  # noqa: E402
+
+
+def _load_chunks(corpus_dir, limit):
+    chunks = []
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            try:
+                extract = get_extractor(name)
+            except ValueError:
+                continue
+            for chunk in iter_chunks(extract(os.path.join(root, name))):
+                chunks.append(chunk)
+                if len(chunks) >= limit:
+                    return chunks
+    return chunks
+
+
+def _timed_encode(texts, backend, onnx_file):
+    encode_local(texts[:8], settings.EMBED_MODEL, backend, onnx_file)  # load + warm up
+    start = time.perf_counter()
+    vectors = encode_local(texts, settings.EMBED_MODEL, backend, onnx_file)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def _top_k(matrix, queries, k):
+    scores = queries @ matrix.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--backend", default="onnx")
+    parser.add_argument("--onnx-file", default=settings.EMBED_ONNX_FILE)
+    parser.add_argument("--queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-chunks", type=int, default=5000)
+    args = parser.parse_args()
+
+    chunks = _load_chunks(args.corpus_dir, args.max_chunks)
+    if not chunks:
+        sys.exit("no supported documents found in corpus_dir")
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        rng = random.Random(0)
+        sample = rng.sample(chunks, min(200, len(chunks)))
+        queries = [c.split(".")[0][:200] for c in sample]
+
+    base, base_rate = _timed_encode(chunks, "torch", "")
+    cand, cand_rate = _timed_encode(chunks, args.backend, args.onnx_file)
+    q_base = encode_local(queries, settings.EMBED_MODEL, "torch", "")
+    q_cand = encode_local(queries, settings.EMBED_MODEL, args.backend, args.onnx_file)
+
+    cosines = np.sum(base * cand, axis=1)  # vectors are L2-normalised
+    top_base = _top_k(base, q_base, args.k)
+    top_cand = _top_k(cand, q_cand, args.k)
+    recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top_base, top_cand)])
+
+    label = f"{args.backend}:{args.onnx_file or 'default'}"
+    print(f"model={settings.EMBED_MODEL} chunks={len(chunks)} queries={len(queries)} k={args.k}")
+    print(f"{'backend':<48}{'chunks/s':>10}")
+    print(f"{'torch':<48}{base_rate:>10.1f}")
+    print(f"{label:<48}{cand_rate:>10.1f}  ({cand_rate / base_rate:.2f}x)")
+    print(f"vector cosine vs torch: mean={cosines.mean():.4f} min={cosines.min():.4f}")
+    print(f"recall@{args.k} vs torch top-{args.k}: {recall:.4f}")
+
+
+if __name__ == "__main__":
+    main()
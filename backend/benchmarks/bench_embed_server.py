@@ -0,0 +1,86 @@
+"""
+Throughput vs. concurrency for single-query embedding requests.
+
+Usage (from backend/):
+    python benchmarks/bench_embed_server.py --url http://localhost:8100 \
+        [--concurrency 1,2,4,8,16,32] [--requests 400] [--local]
+
+Each level fires --requests single-text /embed calls from N client threads
+and reports requests/sec and p50/p99 latency. --local runs the same load
+against the in-process model (one encode per call, no batching) as the
+baseline the server is meant to beat.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+
+WORDS = ("employee salary department policy leave contract revenue region quarter "
+         "customer order invoice clause section manager report total average").split()
+
+
+def _queries(n):
+    rng = random.Random(0)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) for _ in range(n)]
+
+
+def _remote_call(session, url, text):
+    resp = session.post(f"{url}/embed", json={"texts": [text], "model": settings.EMBED_MODEL}, timeout=60)
+    resp.raise_for_status()
+    return np.frombuffer(resp.content, dtype=np.float32)
+
+
+def _run(level, texts, call):
+    latencies = []
+
+    def one(text):
+        start = time.perf_counter()
+        call(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=level) as pool:
+        list(pool.map(one, texts))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(texts) / elapsed, statistics.median(latencies), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.EMBED_SERVER_URL or "http://localhost:8100")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--local", action="store_true", help="also benchmark in-process encoding")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    texts = _queries(args.requests)
+    session = requests.Session()
+    targets = [("server", lambda t: _remote_call(session, args.url.rstrip("/"), t))]
+    if args.local:
+        from services.chunk_embed import encode_local
+        encode_local(["warm up"], settings.EMBED_MODEL)
+        targets.append(("in-process", lambda t: encode_local([t], settings.EMBED_MODEL)))
+
+    print(f"{'target':<12}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, call in targets:
+        call("warm up")
+        for level in levels:
+            rps, p50, p99 = _run(level, texts, call)
+            print(f"{name:<12}{level:>6}{rps:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
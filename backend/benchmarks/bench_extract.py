@@ -0,0 +1,70 @@
+"""
+Per-format extraction throughput on a sample corpus.
+
+Usage (from backend/):
+    python benchmarks/bench_extract.py <corpus_dir> [--workers N] [--min-pages N]
+
+Walks corpus_dir, runs the registered extractor for every supported file and
+reports files, MB, pieces (pages for PDF, paragraphs/lines otherwise),
+pieces/sec and MB/sec per format. --workers / --min-pages override
+PDF_EXTRACT_WORKERS / PDF_PARALLEL_MIN_PAGES so sequential and parallel PDF
+extraction can be compared on the same corpus. Like this script, extract
+workers (run_worker.py extract, a thread pool) run the extractors in a
+non-daemonic process, so the parallel path measured here is the one they take.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+from services.ingest import get_extractor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-pages", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        settings.PDF_EXTRACT_WORKERS = args.workers
+    if args.min_pages is not None:
+        settings.PDF_PARALLEL_MIN_PAGES = args.min_pages
+
+    totals = defaultdict(lambda: {"files": 0, "bytes": 0, "pieces": 0, "chars": 0, "seconds": 0.0})
+    for root, _, files in os.walk(args.corpus_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                extract = get_extractor(name)
+            except ValueError:
+                continue
+            ext = os.path.splitext(name)[1].lower()
+            start = time.perf_counter()
+            pieces = chars = 0
+            for piece in extract(path):
+                pieces += 1
+                chars += len(piece)
+            t = totals[ext]
+            t["seconds"] += time.perf_counter() - start
+            t["files"] += 1
+            t["bytes"] += os.path.getsize(path)
+            t["pieces"] += pieces
+            t["chars"] += chars
+
+    print(f"PDF_EXTRACT_WORKERS={settings.PDF_EXTRACT_WORKERS} PDF_PARALLEL_MIN_PAGES={settings.PDF_PARALLEL_MIN_PAGES}")
+    print(f"{'format':<8}{'files':>7}{'MB':>10}{'pieces':>10}{'sec':>9}{'pieces/s':>11}{'MB/s':>9}")
+    for ext, t in sorted(totals.items()):
+        mb = t["bytes"] / (1024 * 1024)
+        secs = t["seconds"] or 1e-9
+        print(f"{ext:<8}{t['files']:>7}{mb:>10.2f}{t['pieces']:>10}{t['seconds']:>9.2f}"
+              f"{t['pieces'] / secs:>11.1f}{mb / secs:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Recall / latency / memory of the Qdrant collection tuning profiles.
+
+Usage (from backend/):
+    python benchmarks/bench_qdrant_profiles.py --url http://localhost:6333 [--profiles default,scalar,binary,fast] \
+        [--n 20000] [--queries 200] [--k 5] [--synthetic] [--queries-file queries.txt]
+
+Dataset: up to --n vectors (and payloads) scrolled from the live collection
+(QDRANT_URL / COLLECTION_NAME), or random unit vectors with --synthetic.
+Queries are held-out dataset vectors (or --queries-file lines, embedded).
+Ground truth is exact NumPy top-k over the indexed vectors.
+
+For every profile a scratch collection is created with ensure_collection,
+filled, left to finish indexing, and replayed with the profile's search
+params. The report lists recall@k, p50/p99 latency and estimated RAM
+(vectors held in RAM + quantized copies + HNSW links + in-RAM payloads).
+
+--url must be a Qdrant server (e.g. docker run -p 6333:6333 qdrant/qdrant),
+ideally a scratch one: qdrant-client's local mode (":memory:" or a path)
+always searches exactly and ignores HNSW / quantization / on-disk settings,
+so every profile would report the same numbers and it is refused.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.models import Batch  # noqa: E402
+from services.qdrant_store import (  # noqa: E402
+    COLLECTION_PROFILES, get_qdrant_client, ensure_collection, search_chunks,
+)
+
+
+def _load_dataset(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(args.n + args.queries, 384)).astype(np.float32)
+        payloads = [{"document_id": f"doc{i // 50}", "chunk_index": i % 50, "text": "x" * 700}
+                    for i in range(len(vectors))]
+    else:
+        source = get_qdrant_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=60.0)
+        vectors, payloads, offset = [], [], None
+        while len(vectors) < args.n + args.queries:
+            points, offset = source.scroll(
+                settings.COLLECTION_NAME, with_payload=True, with_vectors=True, limit=1024, offset=offset,
+            )
+            vectors.extend(p.vector for p in points)
+            payloads.extend(p.payload for p in points)
+            if offset is None:
+                break
+        vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, payloads
+
+
+def _queries(args, vectors):
+    if args.queries_file:
+        from services.chunk_embed import embed_texts
+
+        with open(args.queries_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        return vectors, embed_texts(texts, settings.EMBED_MODEL)
+    if len(vectors) <= args.queries:
+        sys.exit(f"need more than {args.queries} vectors, got {len(vectors)}")
+    return vectors[:-args.queries], vectors[-args.queries:]
+
+
+def _wait_indexed(client, name, timeout=600):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        info = client.get_collection(name)
+        if str(getattr(info.status, "value", info.status)) == "green":
+            return info
+        time.sleep(0.5)
+    return client.get_collection(name)
+
+
+def _estimated_ram(profile, n, dim, payload_bytes):
+    ram = 0 if profile.get("on_disk_vectors") else n * dim * 4
+    if profile.get("quantization") == "scalar":
+        ram += n * dim
+    elif profile.get("quantization") == "binary":
+        ram += n * dim // 8
+    ram += n * profile.get("m", 16) * 2 * 4  # level-0 HNSW links
+    if not profile.get("on_disk_payload"):
+        ram += payload_bytes
+    return ram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--profiles", default=",".join(COLLECTION_PROFILES))
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--queries-file")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+    if not args.url.startswith(("http://", "https://")):
+        parser.error("--url must be a Qdrant server URL; local mode ignores the profile settings")
+
+    vectors, payloads = _load_dataset(args)
+    base, queries = _queries(args, vectors)
+    payloads = payloads[:len(base)]
+    truth = np.argsort(-(queries @ base.T), axis=1)[:, :args.k]
+    ids = [str(uuid.uuid4()) for _ in range(len(base))]
+    payload_bytes = sum(len(json.dumps(p)) for p in payloads)
+
+    client = QdrantClient(url=args.url, timeout=120)
+    print(f"vectors={len(base)} dim={base.shape[1]} queries={len(queries)} k={args.k}")
+    print(f"{'profile':<10}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}{'RAM MB':>9}{'index s':>9}")
+
+    for name in args.profiles.split(","):
+        collection = f"bench_profile_{name}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        ensure_collection(client, collection, base.shape[1], profile=name)
+        start = time.perf_counter()
+        for s in range(0, len(base), 512):
+            client.upsert(collection, points=Batch(
+                ids=ids[s:s + 512], vectors=base[s:s + 512].tolist(), payloads=payloads[s:s + 512],
+            ))
+        _wait_indexed(client, collection)
+        index_s = time.perf_counter() - start
+
+        latencies, recalls = [], []
+        for q, expected in zip(queries, truth):
+            t = time.perf_counter()
+            hits = search_chunks(client, collection, q.tolist(), limit=args.k, profile=name)
+            latencies.append((time.perf_counter() - t) * 1000)
+            wanted = {ids[i] for i in expected}
+            recalls.append(len(wanted & {h["id"] for h in hits}) / args.k)
+        latencies.sort()
+        ram_mb = _estimated_ram(COLLECTION_PROFILES[name], len(base), base.shape[1], payload_bytes) / 2**20
+        print(f"{name:<10}{statistics.mean(recalls):>10.4f}{latencies[len(latencies) // 2]:>9.2f}"
+              f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:>9.2f}{ram_mb:>9.1f}{index_s:>9.1f}")
+        client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup cost of the API and the Celery worker.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--runs 5] [--query "how many employees?"]
+
+Every measurement runs in a fresh interpreter so module caches start cold:
+  - import_ms:       `import celery_app` (worker) and `import app` (API, no warm-up)
+  - ready_ms:        create_app() until /ready returns 200 (background warm-up)
+  - first_query_ms:  first POST /query right after create_app(), i.e. what the
+                     first user waits for (needs Qdrant, Postgres and OpenAI)
+Reports the median and max over --runs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_IMPORT = """
+import json, os, time
+os.environ["WARMUP_ON_START"] = "false"
+t = time.perf_counter()
+import {module}
+print(json.dumps({{"ms": (time.perf_counter() - t) * 1000}}))
+"""
+
+_READY = """
+import json, os, time
+os.environ["WARMUP_ON_START"] = "false"
+import app as api
+t = time.perf_counter()
+client = api.create_app(warm_up=True).test_client()
+while client.get("/ready").status_code != 200:
+    if time.perf_counter() - t > {timeout}:
+        print(json.dumps({{"ms": None, "status": client.get("/ready").get_json()}}))
+        raise SystemExit
+    time.sleep(0.05)
+print(json.dumps({{"ms": (time.perf_counter() - t) * 1000}}))
+"""
+
+_FIRST_QUERY = """
+import json, os, time
+os.environ["WARMUP_ON_START"] = "false"
+t = time.perf_counter()
+import app as api
+client = api.create_app(warm_up=True).test_client()
+resp = client.post("/query", json={{"query": {query!r}, "top_k": 5}})
+print(json.dumps({{"ms": (time.perf_counter() - t) * 1000, "status": resp.status_code}}))
+"""
+
+
+def _run(code):
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()
+    return json.loads(out[-1])
+
+
+def _measure(label, code, runs):
+    samples = []
+    for _ in range(runs):
+        result = _run(code)
+        if result.get("ms") is None:
+            print(f"{label:<28}not ready: {result.get('status')}")
+            return
+        samples.append(result["ms"])
+    print(f"{label:<28}{statistics.median(samples):>12.1f}{max(samples):>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--query", help="also measure time to the first /query answer")
+    args = parser.parse_args()
+
+    print(f"{'measurement':<28}{'median ms':>12}{'max ms':>12}")
+    _measure("import celery_app", _IMPORT.format(module="celery_app"), args.runs)
+    _measure("import app", _IMPORT.format(module="app"), args.runs)
+    _measure("create_app -> /ready", _READY.format(timeout=args.ready_timeout), args.runs)
+    if args.query:
+        _measure("import -> first /query", _FIRST_QUERY.format(query=args.query), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-task setup overhead of document ingestion: fresh clients vs. per-process reuse.
+
+Usage (from backend/):
+    python benchmarks/bench_task_overhead.py [--tasks 20]
+
+"fresh" replays what process_document_task used to do before any real work:
+a new Qdrant client + ensure_collection (get_collections + create_payload_index
+round trips), a new boto3 client, and a lazily loaded embedding model on the
+first task. "reused" is the current path: resources.init_worker_process() once
+at worker boot, then resources.get_qdrant() / get_s3_client() per task.
+Needs QDRANT_URL (and AWS credentials for a realistic boto3 client).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import boto3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+from s3_client import get_s3_client  # noqa: E402
+from services import resources  # noqa: E402
+from services.chunk_embed import embedding_dim, embed_texts  # noqa: E402
+from services.qdrant_store import get_qdrant_client, ensure_collection  # noqa: E402
+
+
+def _fresh_setup():
+    qdrant = get_qdrant_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=30.0)
+    ensure_collection(qdrant, settings.COLLECTION_NAME, embedding_dim(settings.EMBED_MODEL))
+    boto3.client(
+        "s3", region_name=settings.AWS_REGION,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID, aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
+    embed_texts(["first chunk"], settings.EMBED_MODEL)
+    qdrant.close()
+
+
+def _reused_setup():
+    resources.get_qdrant()
+    get_s3_client()
+    embed_texts(["first chunk"], settings.EMBED_MODEL)
+
+
+def _report(label, samples, boot_ms=None):
+    first, rest = samples[0], samples[1:] or samples
+    boot = f"{boot_ms:>10.1f}" if boot_ms is not None else f"{'-':>10}"
+    print(f"{label:<8}{boot}{first:>12.1f}{statistics.median(rest):>12.1f}{statistics.mean(samples):>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+
+    def run(setup):
+        samples = []
+        for _ in range(args.tasks):
+            start = time.perf_counter()
+            setup()
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    # fresh first, so its first task pays the model load as it used to
+    fresh = run(_fresh_setup)
+
+    start = time.perf_counter()
+    resources.init_worker_process()
+    boot_ms = (time.perf_counter() - start) * 1000
+    reused = run(_reused_setup)
+
+    print(f"setup overhead per task (ms), {args.tasks} tasks")
+    print(f"{'path':<8}{'boot':>10}{'1st task':>12}{'median':>12}{'mean':>12}")
+    _report("fresh", fresh)
+    _report("reused", reused, boot_ms)
+
+
+if __name__ == "__main__":
+    main()
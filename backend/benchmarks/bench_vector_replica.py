@@ -0,0 +1,93 @@
+"""
+Latency and recall of the local vector replica vs. remote Qdrant search.
+
+Usage (from backend/):
+    python benchmarks/bench_vector_replica.py [--queries queries.txt] [--k 5] \
+        [--n 200] [--sync] [--filter-doc DOCUMENT_ID]
+
+--sync brings the replica up to date first (full id diff). Each query is
+embedded once, then searched through Qdrant (replica bypassed) and through
+the replica; the script reports p50/p99 latency per path and recall@k of
+the replica's ids against Qdrant's. Qdrant's HNSW is itself approximate, so
+recall slightly below 1.0 can mean the exact replica found better neighbours.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+from services import vector_replica  # noqa: E402
+from services.chunk_embed import embed_texts, embedding_dim  # noqa: E402
+from services.qdrant_store import get_qdrant_client, search_chunks  # noqa: E402
+
+WORDS = ("employee salary department policy leave contract revenue region quarter "
+         "customer order invoice clause section manager report total average").split()
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def _timed(fn, vectors):
+    results, latencies = [], []
+    for v in vectors:
+        start = time.perf_counter()
+        results.append(fn(v))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries")
+    parser.add_argument("--n", type=int, default=200, help="synthetic queries when --queries is not given")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--filter-doc")
+    parser.add_argument("--sync", action="store_true")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        rng = random.Random(0)
+        queries = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) for _ in range(args.n)]
+
+    client = get_qdrant_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=30.0)
+    settings.VECTOR_REPLICA_ENABLED = True
+    if args.sync:
+        print(f"sync: {vector_replica.sync(client, embedding_dim(settings.EMBED_MODEL), full=True, blocking=True)}")
+    print(f"replica: {vector_replica.stats()}")
+
+    vectors = embed_texts(queries, settings.EMBED_MODEL).tolist()
+    local, local_ms = _timed(lambda v: vector_replica.search(v, args.k, args.filter_doc), vectors)
+    if any(r is None for r in local):
+        sys.exit("replica unavailable (not built, stale or other embedding size); run with --sync")
+
+    settings.VECTOR_REPLICA_ENABLED = False  # search_chunks goes to Qdrant
+    remote, remote_ms = _timed(
+        lambda v: search_chunks(client, settings.COLLECTION_NAME, v, limit=args.k, filter_by_doc=args.filter_doc),
+        vectors,
+    )
+
+    recalls = []
+    for lo, re in zip(local, remote):
+        if re:
+            recalls.append(len({h["id"] for h in lo} & {h["id"] for h in re}) / len(re))
+
+    print(f"queries={len(queries)} k={args.k} filter_doc={args.filter_doc}")
+    print(f"{'path':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, samples in (("qdrant", remote_ms), ("replica", local_ms)):
+        print(f"{name:<10}{_percentile(samples, 50):>10.2f}{_percentile(samples, 99):>10.2f}"
+              f"{statistics.mean(samples):>10.2f}")
+    print(f"recall@{args.k} (replica vs qdrant): {statistics.mean(recalls) if recalls else float('nan'):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from config import settings
 
 
@@ -14,8 +15,53 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # worker_process_init loads the embedding model; the 4s default would kill the child
+    worker_proc_alive_timeout=settings.WORKER_INIT_TIMEOUT,
+    # Each ingestion stage has its own queue so CPU-bound extraction, the
+    # embedding model and Qdrant writes scale independently (run_worker.py)
+    task_routes={
+        "process_document_task": {"queue": settings.INGEST_EXTRACT_QUEUE},
+        "embed_batch_task": {"queue": settings.INGEST_EMBED_QUEUE},
+        "index_document_task": {"queue": settings.INGEST_INDEX_QUEUE},
+        "ingest_failed_task": {"queue": settings.INGEST_INDEX_QUEUE},
+        "reconcile_documents_task": {"queue": settings.INGEST_INDEX_QUEUE},
+    },
 )
 
+# Run with `celery -A celery_app beat` next to the worker
+if settings.RECONCILE_INTERVAL > 0:
+    celery_app.conf.beat_schedule = {
+        "reconcile-documents": {
+            "task": "reconcile_documents_task",
+            "schedule": float(settings.RECONCILE_INTERVAL),
+        },
+    }
+
+
+# Build Qdrant / S3 / DB clients and load the embedding model once per worker
+# process (after the prefork), not per task; WORKER_COMPONENTS narrows that to
+# what the worker's queues use
+@worker_process_init.connect
+def _init_worker_process(**_):
+    from services import resources
+    resources.init_worker_process(settings.WORKER_COMPONENTS or None)
+
+
+# Thread / solo pools run tasks in the worker's main process, where
+# worker_process_init never fires: build the resources there instead
+@worker_init.connect
+def _init_worker(sender=None, **_):
+    pool = getattr(sender, "pool_cls", None)
+    pool = pool if isinstance(pool, str) else getattr(pool, "__module__", "")
+    if pool in ("threads", "solo") or pool.endswith((".thread", ".solo")):
+        from services import resources
+        resources.init_worker_process(settings.WORKER_COMPONENTS or None)
+
+
+@worker_process_shutdown.connect
+def _close_worker_process(**_):
+    from services import resources
+    resources.close()
 
 
 # Ensure task modules are registered when the worker starts
@@ -6,9 +6,7 @@ load_dotenv()
 
 class Settings:
     def __init__(self):
-        # Load multiple DBs from YAML
-        with open("databases.yaml", "r") as f:
-            self.DATABASES = yaml.safe_load(f)["databases"]
+        self._databases = None
 
         # Environment configs
         self.FLASK_ENV = os.getenv("FLASK_ENV", "production")
@@ -19,14 +17,107 @@ class Settings:
 
         self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
         self.OPENAI_MODEL   = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "gpt-4o-mini")
+        self.SQL_GENERATOR_MODEL = os.getenv("SQL_GENERATOR_MODEL", "gpt-4o-mini")
+
+        # Shared LLM gateway (pooled keep-alive client, retries, concurrency cap)
+        self.LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+        self.LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+        self.LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
 
         self.EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        # "torch" | "onnx" | "openvino" (non-torch backends need `pip install sentence-transformers[onnx]`);
+        # EMBED_ONNX_FILE picks an export, e.g. onnx/model_qint8_avx512_vnni.onnx for int8
+        self.EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+        self.EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "")
         self.COLLECTION_NAME = os.getenv("COLLECTION_NAME", "company_docs")
         self.TOP_K = int(os.getenv("TOP_K", "5"))
+        # Context packing before the answer LLM call (services/context_builder.py)
+        self.CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.2"))  # no hit above → no LLM call
+        self.CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+        self.CONTEXT_MAX_REDUNDANCY = float(os.getenv("CONTEXT_MAX_REDUNDANCY", "0.95"))
+        self.EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))  # chunks embedded + upserted per step during ingestion
+        # Large PDFs are extracted in page ranges across a process pool
+        self.PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "200"))
+        self.PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+        # "auto": off inside daemonic processes (Celery prefork children may not fork a pool)
+        self.PDF_PARALLEL_EXTRACT = os.getenv("PDF_PARALLEL_EXTRACT", "auto").lower()
+
+        # Collection tuning profile used when the collection is created and at query time:
+        # default | scalar | binary | fast (see COLLECTION_PROFILES in services/qdrant_store.py)
+        self.QDRANT_PROFILE = os.getenv("QDRANT_PROFILE", "default")
+
+        # Qdrant upserts: batch size, parallel in-flight batches and retries per batch
+        self.QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "128"))
+        self.QDRANT_UPSERT_PARALLEL = int(os.getenv("QDRANT_UPSERT_PARALLEL", "4"))
+        self.QDRANT_UPSERT_RETRIES = int(os.getenv("QDRANT_UPSERT_RETRIES", "3"))
+        self.QDRANT_UPSERT_BACKOFF = float(os.getenv("QDRANT_UPSERT_BACKOFF", "0.5"))
+        # Talk to Qdrant over gRPC (port 6334): vectors travel as packed float32
+        # instead of JSON number arrays
+        self.QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+
+        # Seconds before a cached DB schema is re-validated in the background
+        self.SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", "300"))
+
+        # Per-database connection pools for structured queries
+        self.DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "0"))
+        self.DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+        self.DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+        self.DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))  # idle seconds before a health ping
+
+        # Row caps for structured results (buffered JSON vs. streamed NDJSON)
+        self.SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+        self.SQL_STREAM_MAX_ROWS = int(os.getenv("SQL_STREAM_MAX_ROWS", "100000"))
+        self.SQL_STREAM_BATCH_SIZE = int(os.getenv("SQL_STREAM_BATCH_SIZE", "500"))
+
+        # Hybrid (SQL+RAG) branches run concurrently on a bounded thread pool
+        self.QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+        self.SQL_BRANCH_TIMEOUT = float(os.getenv("SQL_BRANCH_TIMEOUT", "30"))
+        self.RAG_BRANCH_TIMEOUT = float(os.getenv("RAG_BRANCH_TIMEOUT", "15"))
+
+        # Semantic cache of RAG answers in front of /query (SQL results are never reused by similarity)
+        self.SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+        self.SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+        # Exact-match cache for generated SQL (local LRU + Redis at REDIS_URL)
+        self.SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() == "true"
+        self.SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "2000"))
+        self.SQL_CACHE_TTL = int(os.getenv("SQL_CACHE_TTL", "86400"))
+
+        # Two-tier classifier: local name/similarity tier, then memoized LLM calls
+        self.LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+        self.LOCAL_CLASSIFIER_MIN_SIM = float(os.getenv("LOCAL_CLASSIFIER_MIN_SIM", "0.3"))
+        self.LOCAL_CLASSIFIER_RAG_MAX_SIM = float(os.getenv("LOCAL_CLASSIFIER_RAG_MAX_SIM", "0.2"))
+        self.CLASSIFIER_MEMO_SIZE = int(os.getenv("CLASSIFIER_MEMO_SIZE", "2000"))
+        self.CLASSIFIER_MEMO_TTL = int(os.getenv("CLASSIFIER_MEMO_TTL", "3600"))
 
         self.STORAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "storage"))
         self.DOCS_DIR = os.path.join(self.STORAGE_DIR, "documents")
 
+        # Embedding cache: "redis" | "disk" | "none" for chunks, per-process LRU for queries
+        self.EMBED_CACHE_BACKEND = os.getenv("EMBED_CACHE_BACKEND", "redis").lower()
+        self.EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(self.STORAGE_DIR, "embed_cache"))
+        self.EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", str(30 * 24 * 3600)))
+        self.EMBED_QUERY_CACHE_SIZE = int(os.getenv("EMBED_QUERY_CACHE_SIZE", "10000"))
+
+        # Optional shared embedding server (embed_server.py); empty → encode in-process
+        self.EMBED_SERVER_URL = os.getenv("EMBED_SERVER_URL", "").rstrip("/")
+        self.EMBED_SERVER_TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "30"))
+        self.EMBED_SERVER_HOST = os.getenv("EMBED_SERVER_HOST", "127.0.0.1")  # bind address of embed_server.py
+        self.EMBED_SERVER_PORT = int(os.getenv("EMBED_SERVER_PORT", "8100"))
+        # Extra models the server may load on request (EMBED_MODEL is always allowed)
+        self.EMBED_SERVER_MODELS = [m.strip() for m in os.getenv("EMBED_SERVER_MODELS", "").split(",") if m.strip()]
+        # Seconds clients encode in-process after the server failed, before trying it again
+        self.EMBED_SERVER_COOLDOWN = float(os.getenv("EMBED_SERVER_COOLDOWN", "30"))
+        self.EMBED_SERVER_MAX_BATCH = int(os.getenv("EMBED_SERVER_MAX_BATCH", "64"))
+        self.EMBED_SERVER_MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "5"))
+
         # 🔑 Admin key for securing /prompts and /update_prompt
         self.ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "changeme")  # fallback to 'changeme'
 
@@ -43,9 +134,62 @@ class Settings:
         self.AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
         self.AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
         self.S3_BUCKET = os.getenv("S3_BUCKET")
+        # Optional memory-mapped local replica of the Qdrant collection (services/vector_replica.py)
+        self.VECTOR_REPLICA_ENABLED = os.getenv("VECTOR_REPLICA_ENABLED", "false").lower() == "true"
+        self.VECTOR_REPLICA_DIR = os.getenv("VECTOR_REPLICA_DIR", os.path.join(self.STORAGE_DIR, "vector_replica"))
+        self.VECTOR_REPLICA_SYNC_INTERVAL = float(os.getenv("VECTOR_REPLICA_SYNC_INTERVAL", "30"))
+        self.VECTOR_REPLICA_FULL_SYNC_EVERY = int(os.getenv("VECTOR_REPLICA_FULL_SYNC_EVERY", "120"))  # sync rounds
+        self.VECTOR_REPLICA_MAX_LAG = float(os.getenv("VECTOR_REPLICA_MAX_LAG", "600"))  # older → search Qdrant
+        self.VECTOR_REPLICA_COMPACT_RATIO = float(os.getenv("VECTOR_REPLICA_COMPACT_RATIO", "0.25"))
+
+        # Shared S3 client pool and multipart transfer tuning
+        self.S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "50"))
+        self.S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))
+        self.S3_MULTIPART_CHUNKSIZE_MB = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "16"))
+        self.S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", "4"))
+        # Files uploaded to S3 at once by /upload-docs
+        self.UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+        self.UPLOAD_BATCH_TTL = int(os.getenv("UPLOAD_BATCH_TTL", str(24 * 3600)))  # seconds a batch id can be polled
 
         # Celery / Redis
         self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+        # /list-docs page size (default / cap)
+        self.LIST_DOCS_PAGE_SIZE = int(os.getenv("LIST_DOCS_PAGE_SIZE", "100"))
+        self.LIST_DOCS_MAX_PAGE_SIZE = int(os.getenv("LIST_DOCS_MAX_PAGE_SIZE", "1000"))
+        # Periodic documents-table vs. Qdrant consistency check (celery beat); 0 disables
+        self.RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "3600"))
+        self.RECONCILE_DELETE_ORPHANS = os.getenv("RECONCILE_DELETE_ORPHANS", "false").lower() == "true"
+
+        # Seconds a Celery worker process may spend building its clients / model at boot
+        self.WORKER_INIT_TIMEOUT = float(os.getenv("WORKER_INIT_TIMEOUT", "300"))
+        # Components a worker process builds at boot (comma list of embedder,qdrant,db,s3; empty = all)
+        self.WORKER_COMPONENTS = [c.strip() for c in os.getenv("WORKER_COMPONENTS", "").split(",") if c.strip()]
+
+        # Staged ingestion: queue, concurrency and prefetch per stage (see run_worker.py)
+        self.INGEST_EXTRACT_QUEUE = os.getenv("INGEST_EXTRACT_QUEUE", "ingest.extract")
+        self.INGEST_EMBED_QUEUE = os.getenv("INGEST_EMBED_QUEUE", "ingest.embed")
+        self.INGEST_INDEX_QUEUE = os.getenv("INGEST_INDEX_QUEUE", "ingest.index")
+        self.INGEST_EXTRACT_CONCURRENCY = int(os.getenv("INGEST_EXTRACT_CONCURRENCY", str(os.cpu_count() or 1)))
+        self.INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "1"))  # one model copy per process
+        self.INGEST_INDEX_CONCURRENCY = int(os.getenv("INGEST_INDEX_CONCURRENCY", "4"))
+        self.INGEST_EXTRACT_PREFETCH = int(os.getenv("INGEST_EXTRACT_PREFETCH", "1"))  # long, uneven tasks
+        self.INGEST_EMBED_PREFETCH = int(os.getenv("INGEST_EMBED_PREFETCH", "4"))
+        self.INGEST_INDEX_PREFETCH = int(os.getenv("INGEST_INDEX_PREFETCH", "1"))
+        # Extract workers run a thread pool: prefork children are daemonic and could not
+        # start the PDF page pool (PDF_EXTRACT_WORKERS), which does the CPU-heavy part
+        self.INGEST_EXTRACT_POOL = os.getenv("INGEST_EXTRACT_POOL", "threads")
+
+        # Build Qdrant / embedder / DB in a background thread when the app starts
+        self.WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() == "true"
+
+    @property
+    def DATABASES(self):
+        # Multiple DBs from YAML, read on first access rather than at import
+        if self._databases is None:
+            with open("databases.yaml", "r") as f:
+                self._databases = yaml.safe_load(f)["databases"]
+        return self._databases
+
 settings = Settings()
 os.makedirs(settings.DOCS_DIR, exist_ok=True)
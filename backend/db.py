@@ -1,6 +1,6 @@
 from typing import Generator
 
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, text
+from sqlalchemy import create_engine, Column, String, Integer, DateTime, Index, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from config import settings
@@ -24,7 +24,6 @@ class Base(DeclarativeBase):
 
 class Documents(Base):
     __tablename__ = "documents"
-    __table_args__ = {"schema": "public"}
 
     # Existing schema:
     # id         | text (not null)
@@ -38,10 +37,26 @@ class Documents(Base):
     chunks = Column(Integer)
     created_at = Column(DateTime, server_default=text("now()"))
 
+    # Newest-first keyset pagination for /list-docs (plain and filtered by status)
+    __table_args__ = (
+        Index("ix_documents_created_at_id", created_at.desc(), id.desc(), postgresql_concurrently=True),
+        Index("ix_documents_status_created_at_id", status, created_at.desc(), id.desc(),
+              postgresql_concurrently=True),
+        {"schema": "public"},
+    )
+
 
 def init_db() -> None:
-    # Using an existing table managed outside migrations; no-op to avoid DDL.
-    return None
+    # The table itself is managed outside migrations; only add the listing
+    # indexes if they are missing (best effort: the role may lack DDL rights).
+    # CREATE INDEX CONCURRENTLY does not block writes but cannot run inside a
+    # transaction, hence the autocommit connection.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in Documents.__table__.indexes:
+            try:
+                index.create(bind=conn, checkfirst=True)
+            except Exception as e:
+                print(f"[DB] index {index.name} not created: {e}")
 
 
 def get_db_session() -> Generator:
@@ -0,0 +1,115 @@
+"""
+Shared embedding server: owns one SentenceTransformer copy and coalesces
+concurrent requests into micro-batches.
+
+Run a single process (the point is one model copy), e.g.
+    python embed_server.py
+    gunicorn -w 1 --threads 64 -b 127.0.0.1:8100 embed_server:app
+
+and point the API / Celery workers at it with EMBED_SERVER_URL=http://host:8100.
+The server is unauthenticated: it binds EMBED_SERVER_HOST (127.0.0.1 by
+default) and only serves EMBED_MODEL plus the EMBED_SERVER_MODELS allowlist.
+
+POST /embed  {"texts": [...], "model": "..."} → raw float32 bytes (row-major),
+             shape in the X-Embedding-Dim header.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from flask import Flask, request, jsonify, Response
+
+from config import settings
+from services.chunk_embed import encode_local, get_embedder
+
+app = Flask(__name__)
+
+_requests = queue.Queue()  # (model_name, texts, Future)
+_stats = {"requests": 0, "texts": 0, "batches": 0}
+
+
+def _batch_loop():
+    """
+    Take the first waiting request, then keep collecting until the batch is
+    full or EMBED_SERVER_MAX_WAIT_MS has passed, and encode once per model.
+    """
+    max_wait = settings.EMBED_SERVER_MAX_WAIT_MS / 1000
+    while True:
+        batch = [_requests.get()]
+        size = len(batch[0][1])
+        deadline = time.perf_counter() + max_wait
+        while size < settings.EMBED_SERVER_MAX_BATCH:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = _requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1])
+
+        by_model = {}
+        for item in batch:
+            by_model.setdefault(item[0], []).append(item)
+        for model_name, items in by_model.items():
+            texts = [t for _, item_texts, _ in items for t in item_texts]
+            try:
+                vectors = encode_local(texts, model_name)
+            except Exception as e:
+                for _, _, fut in items:
+                    fut.set_exception(e)
+                continue
+            _stats["batches"] += 1
+            offset = 0
+            for _, item_texts, fut in items:
+                fut.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+threading.Thread(target=_batch_loop, name="embed-batcher", daemon=True).start()
+
+
+@app.post("/embed")
+def embed():
+    data = request.get_json(force=True)
+    texts = data.get("texts") or []
+    model_name = data.get("model") or settings.EMBED_MODEL
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({"error": "texts must be a list of strings"}), 400
+    if not texts:
+        return jsonify({"error": "texts is required"}), 400
+    if model_name != settings.EMBED_MODEL and model_name not in settings.EMBED_SERVER_MODELS:
+        return jsonify({"error": f"model '{model_name}' is not served here"}), 400
+
+    fut = Future()
+    _requests.put((model_name, texts, fut))
+    vectors = np.ascontiguousarray(fut.result(), dtype=np.float32)
+    _stats["requests"] += 1
+    _stats["texts"] += len(texts)
+    return Response(
+        vectors.tobytes(),
+        mimetype="application/octet-stream",
+        headers={"X-Embedding-Dim": str(vectors.shape[1])},
+    )
+
+
+@app.get("/health")
+def health():
+    batches = _stats["batches"]
+    return jsonify({
+        "ok": True,
+        "model": settings.EMBED_MODEL,
+        **_stats,
+        "avg_batch_texts": round(_stats["texts"] / batches, 2) if batches else 0.0,
+    })
+
+
+# Load the default model before serving traffic
+get_embedder(settings.EMBED_MODEL)
+
+
+if __name__ == "__main__":
+    app.run(host=settings.EMBED_SERVER_HOST, port=settings.EMBED_SERVER_PORT, debug=False, use_reloader=False, threaded=True)
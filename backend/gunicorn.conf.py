@@ -0,0 +1,14 @@
+# Gunicorn settings for the API (picked up automatically from the working directory).
+#
+# /query/stream keeps its connection open for the whole answer generation, so
+# the default sync worker would be tied up per stream. Threaded workers (gthread)
+# park a stream on one thread instead and keep heartbeating while it runs.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
@@ -0,0 +1,58 @@
+"""
+Start a Celery worker for one ingestion stage.
+
+Usage (from backend/):
+    python run_worker.py extract|embed|index|all [extra celery worker args]
+
+Each stage consumes its own queue with its own concurrency / prefetch
+(INGEST_<STAGE>_CONCURRENCY, INGEST_<STAGE>_PREFETCH) and builds only the
+resources it uses at process boot: only embed workers load the embedding
+model (extract and index workers get a bare Qdrant client and take the
+vector size from the embed stage's output), and embed workers never open
+Qdrant. Extract workers use a thread pool (INGEST_EXTRACT_POOL): a prefork
+child is daemonic and cannot start the process pool that extracts large
+PDFs page range by page range, a threaded worker can. "all" consumes every
+queue in a single prefork worker, as before the split, with sequential PDF
+extraction. The beat-scheduled reconcile task runs on the index queue. Start
+beat separately with `celery -A celery_app beat`.
+"""
+import sys
+
+from config import settings
+
+_STAGES = {
+    # stage: (queues, components, pool, concurrency, prefetch)
+    "extract": (settings.INGEST_EXTRACT_QUEUE, "qdrant_client,db,s3", settings.INGEST_EXTRACT_POOL,
+                settings.INGEST_EXTRACT_CONCURRENCY, settings.INGEST_EXTRACT_PREFETCH),
+    "embed": (settings.INGEST_EMBED_QUEUE, "embedder,s3", "prefork",
+              settings.INGEST_EMBED_CONCURRENCY, settings.INGEST_EMBED_PREFETCH),
+    "index": (settings.INGEST_INDEX_QUEUE, "qdrant_client,db,s3", "prefork",
+              settings.INGEST_INDEX_CONCURRENCY, settings.INGEST_INDEX_PREFETCH),
+}
+
+
+def main(argv):
+    if not argv or argv[0] not in (*_STAGES, "all"):
+        print(__doc__)
+        return 2
+    stage, extra = argv[0], argv[1:]
+    if stage == "all":
+        queues = ",".join(q for q, *_ in _STAGES.values())
+        args = ["worker", "-Q", queues, "-n", "all@%h"]
+    else:
+        queues, components, pool, concurrency, prefetch = _STAGES[stage]
+        # read by the worker init hooks in celery_app
+        if not settings.WORKER_COMPONENTS:
+            settings.WORKER_COMPONENTS = components.split(",")
+        args = [
+            "worker", "-Q", queues, "-n", f"{stage}@%h", "-P", pool,
+            "-c", str(concurrency), "--prefetch-multiplier", str(prefetch),
+        ]
+
+    from celery_app import celery_app
+    celery_app.worker_main(args + ["--loglevel", "INFO"] + extra)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,23 +1,58 @@
+import threading
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from typing import BinaryIO, Optional
 
 from config import settings
 
+_MB = 1024 * 1024
+
+# boto3 clients are thread-safe: one per process, with a connection pool large
+# enough for concurrent uploads x multipart parts in flight.
+_client = None
+_lock = threading.Lock()
+
+_transfer_config = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * _MB,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE_MB * _MB,
+    max_concurrency=settings.S3_TRANSFER_CONCURRENCY,
+)
+
 
 def get_s3_client() -> BaseClient:
-    return boto3.client(
-        "s3",
-        region_name=settings.AWS_REGION,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    )
+    global _client
+    with _lock:
+        if _client is None:
+            _client = boto3.client(
+                "s3",
+                region_name=settings.AWS_REGION,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                config=Config(
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                ),
+            )
+    return _client
+
+
+def reset_client() -> None:
+    """
+    Forget the shared client (e.g. in a freshly forked worker process).
+    """
+    global _client
+    with _lock:
+        _client = None
 
 
 def upload_stream(bucket: str, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
     client = get_s3_client()
     extra = {"ContentType": content_type} if content_type else None
-    client.upload_fileobj(stream, bucket, key, ExtraArgs=extra)
+    client.upload_fileobj(stream, bucket, key, ExtraArgs=extra, Config=_transfer_config)
 
 
 def get_object_stream(bucket: str, key: str) -> BinaryIO:
@@ -31,3 +66,43 @@ def delete_object(bucket: str, key: str) -> None:
     client = get_s3_client()
     client.delete_object(Bucket=bucket, Key=key)
 
+
+def head_etag(bucket: str, key: str) -> str:
+    client = get_s3_client()
+    return client.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+
+
+def put_bytes(bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+    client = get_s3_client()
+    client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+
+
+def get_bytes(bucket: str, key: str) -> Optional[bytes]:
+    """
+    Object contents, or None if the key does not exist.
+    """
+    client = get_s3_client()
+    try:
+        return client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except client.exceptions.NoSuchKey:
+        return None
+
+
+def object_exists(bucket: str, key: str) -> bool:
+    client = get_s3_client()
+    try:
+        client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def delete_prefix(bucket: str, prefix: str) -> None:
+    client = get_s3_client()
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if keys:
+            client.delete_objects(Bucket=bucket, Delete={"Objects": keys, "Quiet": True})
+
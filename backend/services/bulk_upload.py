@@ -0,0 +1,116 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from celery import group, states as task_states
+from celery.result import GroupResult
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from db import Documents
+from s3_client import upload_stream
+from .redis_client import get_redis, mark_failed
+
+_BATCH_PREFIX = "querycraft:upload-batch:"
+
+
+def upload_all(entries):
+    """
+    Upload every entry's stream to S3 concurrently (UPLOAD_CONCURRENCY files
+    at a time, each possibly multipart). Returns {document_id: error} for the
+    uploads that failed.
+    """
+    def put(entry):
+        try:
+            upload_stream(settings.S3_BUCKET, entry["s3_key"], entry["stream"], content_type=entry["mimetype"])
+            return entry["document_id"], None
+        except Exception as e:
+            return entry["document_id"], str(e)
+
+    with ThreadPoolExecutor(max_workers=settings.UPLOAD_CONCURRENCY) as pool:
+        return {doc_id: err for doc_id, err in pool.map(put, entries) if err}
+
+
+def insert_pending(db, entries) -> None:
+    """
+    One INSERT ... ON CONFLICT for the whole batch: new documents get a
+    pending row, existing ones are reset to pending for re-indexing.
+    """
+    stmt = insert(Documents).values([
+        {"id": e["document_id"], "file_url": f"s3://{settings.S3_BUCKET}/{e['s3_key']}",
+         "status": "pending", "chunks": 0}
+        for e in entries
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Documents.id],
+        set_={"file_url": stmt.excluded.file_url, "status": "pending"},
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def enqueue(task, entries) -> str:
+    """
+    Enqueue one processing task per entry as a Celery group and return its
+    id, which doubles as the pollable batch id.
+    """
+    job = group(task.s(e["document_id"], e["document_id"], e["s3_key"], e["filename"]) for e in entries)
+    result = job.apply_async()
+    result.save()
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(_BATCH_PREFIX + result.id, json.dumps([e["document_id"] for e in entries]),
+                       ex=settings.UPLOAD_BATCH_TTL)
+        except redis.RedisError as e:
+            mark_failed(e, "Upload Batch")
+    return result.id
+
+
+def _batch_document_ids(batch_id: str):
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_BATCH_PREFIX + batch_id)
+    except redis.RedisError as e:
+        mark_failed(e, "Upload Batch")
+        return None
+    return json.loads(raw) if raw else None
+
+
+def progress(db, app, batch_id: str):
+    """
+    Aggregate progress of a batch from its Celery task states and the
+    documents rows (status, chunks so far). None if the batch is unknown.
+    """
+    result = GroupResult.restore(batch_id, app=app)
+    if result is None:
+        return None
+    states = [r.state for r in result.results]
+    document_ids = _batch_document_ids(batch_id) or []
+
+    documents = []
+    if document_ids:
+        rows = {r.id: r for r in db.execute(select(Documents).where(Documents.id.in_(document_ids))).scalars()}
+        for doc_id, state in zip(document_ids, states):
+            rec = rows.get(doc_id)
+            documents.append({
+                "document_id": doc_id,
+                "task_state": state,
+                "status": rec.status if rec else None,
+                "chunks": (rec.chunks or 0) if rec else 0,
+            })
+
+    finished = sum(s in task_states.READY_STATES for s in states)
+    return {
+        "batch_id": batch_id,
+        "total": len(states),
+        "succeeded": sum(s == task_states.SUCCESS for s in states),
+        "failed": sum(s in task_states.EXCEPTION_STATES for s in states),
+        "running": len(states) - finished,
+        "done": finished == len(states),
+        "chunks": sum(d["chunks"] for d in documents),
+        "documents": documents,
+    }
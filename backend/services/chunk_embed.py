@@ -1,14 +1,45 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter  # langchain-text-splitter (installed with langchain or separately)
-from sentence_transformers import SentenceTransformer
+import threading
+import time
 import numpy as np
+import requests
+from config import settings
+from . import embed_cache
 
-# Keep a single global model instance (warm, fast)
+# Keep a single global model instance per (model, backend, onnx file) (warm, fast).
+# sentence_transformers (and torch) are imported on first load, not at import time.
 _model_cache = {}
+_model_lock = threading.Lock()
 
-def get_embedder(model_name: str):
-    if model_name not in _model_cache:
-        _model_cache[model_name] = SentenceTransformer(model_name)
-    return _model_cache[model_name]
+def get_embedder(model_name: str, backend: str = None, onnx_file: str = None):
+    """
+    backend: "torch" (default), "onnx" or "openvino"; onnx_file selects a specific
+    export inside the model repo, e.g. "onnx/model_qint8_avx512_vnni.onnx" for int8.
+    """
+    backend = backend or settings.EMBED_BACKEND
+    onnx_file = onnx_file if onnx_file is not None else settings.EMBED_ONNX_FILE
+    key = (model_name, backend, onnx_file if backend != "torch" else "")
+    if key in _model_cache:
+        return _model_cache[key]
+    with _model_lock:
+        if key not in _model_cache:
+            from sentence_transformers import SentenceTransformer
+
+            if backend == "torch":
+                _model_cache[key] = SentenceTransformer(model_name)
+            else:
+                model_kwargs = {"file_name": onnx_file} if onnx_file else None
+                _model_cache[key] = SentenceTransformer(model_name, backend=backend, model_kwargs=model_kwargs)
+    return _model_cache[key]
+
+def embedder_id(model_name: str) -> str:
+    """
+    Identity of the vectors produced for model_name under the configured backend;
+    used to namespace cached embeddings so backends never mix.
+    """
+    if settings.EMBED_BACKEND == "torch":
+        return model_name
+    return f"{model_name}@{settings.EMBED_BACKEND}:{settings.EMBED_ONNX_FILE or 'default'}"
 
 def chunk_text(text: str, chunk_size=700, chunk_overlap=100):
     splitter = RecursiveCharacterTextSplitter(
@@ -18,14 +49,112 @@ def chunk_text(text: str, chunk_size=700, chunk_overlap=100):
     )
     return splitter.split_text(text)
 
-def embed_texts(texts, model_name: str):
-    model = get_embedder(model_name)
+def iter_chunks(pieces, chunk_size=700, chunk_overlap=100):
+    """
+    Chunk a stream of text pieces (e.g. PDF pages) incrementally.
+
+    Pieces are joined with newlines into a small rolling buffer; every chunk
+    but the last is emitted and the last one is carried over, so chunks can
+    span page boundaries without the whole document ever being in memory.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ".", " ", ""],
+    )
+    buffer = ""
+    for piece in pieces:
+        buffer = f"{buffer}\n{piece}" if buffer else piece
+        if len(buffer) < chunk_size * 4:
+            continue
+        chunks = splitter.split_text(buffer)
+        for chunk in chunks[:-1]:
+            yield chunk
+        buffer = chunks[-1] if chunks else ""
+    if buffer:
+        yield from splitter.split_text(buffer)
+
+def encode_local(texts, model_name: str, backend: str = None, onnx_file: str = None):
+    model = get_embedder(model_name, backend, onnx_file)
     # batch encode for speed
     vectors = model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=True)
     # ensure float32
     return np.asarray(vectors, dtype=np.float32)
 
+# Keep-alive session for the optional embedding server (EMBED_SERVER_URL)
+_server_session = requests.Session()
+_server_dims = {}
+_server_down_until = 0.0  # monotonic time before which the server is not retried
+
+def _encode_remote(texts, model_name: str):
+    resp = _server_session.post(
+        f"{settings.EMBED_SERVER_URL}/embed",
+        json={"texts": texts, "model": model_name},
+        timeout=settings.EMBED_SERVER_TIMEOUT,
+    )
+    resp.raise_for_status()
+    dim = int(resp.headers["X-Embedding-Dim"])
+    return np.frombuffer(resp.content, dtype=np.float32).reshape(len(texts), dim)
+
+def _encode(texts, model_name: str):
+    """
+    Encode through the shared embedding server when configured, falling back
+    to the in-process model if it is unreachable. After a failure the server
+    is skipped for EMBED_SERVER_COOLDOWN seconds instead of waiting out the
+    request timeout on every call.
+    """
+    global _server_down_until
+    if settings.EMBED_SERVER_URL and texts and time.monotonic() >= _server_down_until:
+        try:
+            return _encode_remote(texts, model_name)
+        except Exception as e:
+            _server_down_until = time.monotonic() + settings.EMBED_SERVER_COOLDOWN
+            print(f"[Embed] Embedding server unavailable, encoding in-process "
+                  f"for {settings.EMBED_SERVER_COOLDOWN:g}s: {e}")
+    return encode_local(texts, model_name)
+
+def embed_texts(texts, model_name: str):
+    """
+    Embed texts, encoding only those missing from the content-hash embedding cache.
+    """
+    texts = list(texts)
+    if not texts:
+        return _encode(texts, model_name)
+    cache_ns = embedder_id(model_name)
+    cached = embed_cache.lookup_many(cache_ns, texts)
+    missing = [i for i, v in enumerate(cached) if v is None]
+    if not missing:
+        return np.stack(cached)
+
+    encoded = _encode([texts[i] for i in missing], model_name)
+    embed_cache.store_many(cache_ns, [texts[i] for i in missing], encoded)
+    vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+    for i, v in enumerate(cached):
+        if v is not None:
+            vectors[i] = v
+    vectors[missing] = encoded
+    return vectors
+
+def embed_query(text: str, model_name: str):
+    """
+    Single query vector, served from the per-process query LRU when possible.
+    """
+    cache_ns = embedder_id(model_name)
+    vector = embed_cache.query_lookup(cache_ns, text)
+    if vector is None:
+        vector = _encode([text], model_name)[0]
+        embed_cache.query_store(cache_ns, text, vector)
+    return vector
+
 def embedding_dim(model_name: str) -> int:
     # MiniLM-L6-v2 = 384
+    if settings.EMBED_SERVER_URL:
+        if model_name not in _server_dims:
+            try:
+                _server_dims[model_name] = _encode_remote(["dim"], model_name).shape[1]
+            except Exception as e:
+                print(f"[Embed] Embedding server unavailable, loading model in-process: {e}")
+        if model_name in _server_dims:
+            return _server_dims[model_name]
     model = get_embedder(model_name)
     return int(model.get_sentence_embedding_dimension())
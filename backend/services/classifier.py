@@ -1,19 +1,62 @@
-from openai import OpenAI
-import os
+import hashlib
+import threading
+
+from config import settings
+from services import llm_gateway
 from services.prompt_manager import load_prompts
+from services.local_classifier import classify_locally
+from services.lru import LRUCache
+from services.sql_cache import normalize_question
+
+
+# Schema summaries keyed by catalog versions; LLM decisions keyed by question + summary + prompt
+_schema_lists = LRUCache(max_entries=32)
+_decisions = LRUCache(settings.CLASSIFIER_MEMO_SIZE, settings.CLASSIFIER_MEMO_TTL)
+_stats = {"local": 0, "memoized": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def _schema_list(all_schemas):
+    key = tuple(sorted((db_name, schema.get("version")) for db_name, schema in all_schemas.items()))
+    cached = _schema_lists.get(key)
+    if cached is not None:
+        return cached
 
-def classify_query(query, all_schemas):
+    # Build schema descriptions with tables + columns
+    schema_texts = []
+    for db_name, schema in all_schemas.items():
+        table_descs = []
+        for t in schema["tables"]:
+            cols = [c["name"] for c in t["columns"][:5]]  # limit to 5 cols for brevity
+            col_list = ", ".join(cols)
+            table_descs.append(f"{t['name']}({col_list})")
+        schema_texts.append(f"- {db_name}: {', '.join(table_descs)}")
+
+    schema_list = "\n".join(schema_texts)
+    # Unversioned schemas (not from the catalog) can't be keyed safely
+    if all(v is not None for _, v in key):
+        _schema_lists.set(key, schema_list)
+    return schema_list
+
+
+def classify_query(query, all_schemas, query_vector=None):
     """
     Classify a query as SQL, RAG, or SQL+RAG.
-    
+
+    A local tier (name matching + table-description similarity) answers
+    unambiguous queries; everything else goes to the LLM, whose decisions
+    are memoized.
+
     Args:
         query (str): User query
         all_schemas (dict): {db_name: schema_dict}
-        client: OpenAI client
-    
+        query_vector: optional precomputed embedding of query
+
     Returns:
         dict: {"mode": "SQL"|"RAG"|"SQL+RAG", "db_name": str|None}
     """
@@ -24,29 +67,46 @@ def classify_query(query, all_schemas):
     if not base_prompt:
         raise ValueError("Classifier prompt not found in prompts.json")
 
+    if settings.LOCAL_CLASSIFIER_ENABLED:
+        decision = classify_locally(query, all_schemas, query_vector)
+        if decision:
+            _count("local")
+            return decision
+
+    schema_list = _schema_list(all_schemas)
+    memo_key = hashlib.sha256(
+        "\x1f".join([normalize_question(query), schema_list, base_prompt]).encode("utf-8")
+    ).hexdigest()
+    memoized = _decisions.get(memo_key)
+    if memoized is not None:
+        _count("memoized")
+        return dict(memoized)
 
-    # Build schema descriptions with tables + columns
-    schema_texts = []
-    for db_name, schema in all_schemas.items():
-        table_descs = []
-        for t in schema["tables"]:
-            cols = [c["name"] for c in t["columns"][:5]]  # limit to 5 cols for brevity
-            col_list = ", ".join(cols)
-            table_descs.append(f"{t['name']}({col_list})")
-        schema_texts.append(f"- {db_name}: {', '.join(table_descs)}")
-    
-    schema_list = "\n".join(schema_texts)
     prompt = base_prompt.format(query=query, schema_list=schema_list)
 
-    res = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+    _count("llm")
+    content = llm_gateway.chat(
+        [{"role": "user", "content": prompt}],
+        model=settings.CLASSIFIER_MODEL,
+        purpose="classifier",
         temperature=0,
         max_tokens=200
     )
     
     import json
     try:
-        return json.loads(res.choices[0].message.content.strip())
+        decision = json.loads(content.strip())
     except Exception:
         return {"mode": "RAG", "db_name": None}
+    _decisions.set(memo_key, decision)
+    return dict(decision)
+
+
+def stats():
+    with _stats_lock:
+        counts = dict(_stats)
+    total = sum(counts.values())
+    return {
+        **counts,
+        "local_share": round(counts["local"] / total, 4) if total else 0.0,
+    }
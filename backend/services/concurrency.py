@@ -0,0 +1,47 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import settings
+
+# One bounded pool per process for fanning out independent request branches
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.QUERY_WORKERS, thread_name_prefix="query")
+    return _executor
+
+
+def submit_timed(fn, *args, **kwargs):
+    """
+    Run fn on the shared pool. The future resolves to (result, elapsed_ms).
+    """
+    def timed():
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, round((time.perf_counter() - start) * 1000, 1)
+
+    return get_executor().submit(timed)
+
+
+def wait_branch(future, deadline: float):
+    """
+    Wait for a submit_timed future until the perf_counter() deadline.
+
+    Returns (result, elapsed_ms, error); on timeout or failure result is None
+    and error describes what happened. Timed-out work keeps running in the
+    background but its result is discarded.
+    """
+    try:
+        result, elapsed_ms = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        return result, elapsed_ms, None
+    except FutureTimeout:
+        future.cancel()
+        return None, None, "timed out"
+    except Exception as e:
+        return None, None, str(e)
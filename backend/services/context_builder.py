@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+
+from config import settings
+
+NO_CONTEXT_ANSWER = "I couldn't find anything in the uploaded documents that is relevant to this question."
+
+# Longest chunk overlap looked for when merging neighbours (chunk_text uses 100 chars)
+_MAX_OVERLAP = 200
+_MIN_OVERLAP = 20
+
+_stats = {"requests": 0, "llm_skipped": 0, "tokens_in": 0, "tokens_used": 0}
+_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with OpenAI tokenizers
+    return (len(text) + 3) // 4
+
+
+def _mmr(hits, lam: float, max_redundancy: float):
+    """
+    Maximal-marginal-relevance order over the hits' vectors; hits nearly
+    identical to one already picked are dropped. Without vectors the
+    score order is kept.
+    """
+    if len(hits) < 2 or any(h.get("vector") is None for h in hits):
+        return list(hits)
+    vectors = np.asarray([h["vector"] for h in hits], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    sims = vectors @ vectors.T
+    relevance = np.asarray([h["score"] for h in hits], dtype=np.float32)
+
+    picked = [int(np.argmax(relevance))]
+    remaining = [i for i in range(len(hits)) if i != picked[0]]
+    while remaining:
+        redundancy = sims[np.ix_(remaining, picked)].max(axis=1)
+        keep = redundancy < max_redundancy
+        remaining = [i for i, k in zip(remaining, keep) if k]
+        if not remaining:
+            break
+        redundancy = redundancy[keep]
+        mmr = lam * relevance[remaining] - (1 - lam) * redundancy
+        picked.append(remaining.pop(int(np.argmax(mmr))))
+    return [hits[i] for i in picked]
+
+
+def _join(a: str, b: str) -> str:
+    """
+    Concatenate consecutive chunks, dropping the splitter overlap between them.
+    """
+    for k in range(min(len(a), len(b), _MAX_OVERLAP), _MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return a + b[k:]
+    return f"{a}\n{b}"
+
+
+def _merge_adjacent(hits):
+    """
+    Merge hits of the same document with consecutive chunk_index into one
+    context, keeping the rank of its best-ranked member.
+    """
+    groups = []  # [rank, document_id, [hits sorted by chunk_index]]
+    by_doc = {}
+    for rank, hit in enumerate(hits):
+        by_doc.setdefault(hit["payload"].get("document_id"), []).append((rank, hit))
+    for document_id, ranked in by_doc.items():
+        ranked.sort(key=lambda rh: rh[1]["payload"].get("chunk_index", -1))
+        current = None
+        for rank, hit in ranked:
+            idx = hit["payload"].get("chunk_index")
+            if current and idx is not None and current[2][-1]["payload"].get("chunk_index") == idx - 1:
+                current[2].append(hit)
+                current[0] = min(current[0], rank)
+            else:
+                current = [rank, document_id, [hit]]
+                groups.append(current)
+    groups.sort(key=lambda g: g[0])
+
+    merged = []
+    for _, _, members in groups:
+        text = members[0]["payload"]["text"]
+        for hit in members[1:]:
+            text = _join(text, hit["payload"]["text"])
+        merged.append({
+            "score": max(h["score"] for h in members),
+            "payload": {
+                **members[0]["payload"],
+                "text": text,
+                "chunk_indexes": [h["payload"].get("chunk_index") for h in members],
+            },
+            "members": members,
+        })
+    return merged
+
+
+def build_context(hits, budget_tokens: int = None, min_score: float = None):
+    """
+    Turn raw search hits into the contexts passed to make_answer.
+
+    Drops hits below min_score, prunes near-duplicates (MMR on the returned
+    vectors), merges neighbouring chunks of a document so their overlap is
+    sent once, and keeps the best-ranked contexts that fit budget_tokens.
+
+    Returns (contexts, used_hits, report). contexts is empty when no hit
+    clears min_score: callers answer with NO_CONTEXT_ANSWER instead of
+    calling the LLM.
+    """
+    budget_tokens = settings.CONTEXT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    min_score = settings.CONTEXT_MIN_SCORE if min_score is None else min_score
+
+    tokens_in = sum(estimate_tokens(h["payload"].get("text", "")) for h in hits)
+    relevant = [h for h in hits if h["score"] >= min_score]
+    ranked = _mmr(relevant, settings.CONTEXT_MMR_LAMBDA, settings.CONTEXT_MAX_REDUNDANCY)
+
+    contexts, used, tokens_used = [], [], 0
+    for ctx in _merge_adjacent(ranked):
+        cost = estimate_tokens(ctx["payload"]["text"])
+        if tokens_used + cost > budget_tokens:
+            if contexts:
+                continue
+            # never drop the best context entirely: cut it to the budget
+            ctx["payload"]["text"] = ctx["payload"]["text"][:budget_tokens * 4]
+            cost = estimate_tokens(ctx["payload"]["text"])
+        tokens_used += cost
+        used.extend(ctx.pop("members"))
+        contexts.append(ctx)
+
+    report = {
+        "hits": len(hits),
+        "used_hits": len(used),
+        "contexts": len(contexts),
+        "tokens_in": tokens_in,
+        "tokens_used": tokens_used,
+        "tokens_saved": tokens_in - tokens_used,
+        "llm_skipped": not contexts,
+    }
+    with _lock:
+        _stats["requests"] += 1
+        _stats["llm_skipped"] += int(not contexts)
+        _stats["tokens_in"] += tokens_in
+        _stats["tokens_used"] += tokens_used
+    return contexts, used, report
+
+
+def stats():
+    with _lock:
+        return {**_stats, "tokens_saved": _stats["tokens_in"] - _stats["tokens_used"]}
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from config import settings
+
+
+def config_fingerprint(db_config) -> str:
+    """
+    Stable key for a connection config; changes whenever host/db/user/password change.
+    """
+    raw = json.dumps(dict(db_config), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class _BoundedPool:
+    """
+    ThreadedConnectionPool that blocks (up to a timeout) instead of raising
+    when every connection is borrowed, and pings connections that sat idle.
+    """
+
+    def __init__(self, db_config):
+        self._pool = pg_pool.ThreadedConnectionPool(
+            settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE, **db_config
+        )
+        self._slots = threading.BoundedSemaphore(settings.DB_POOL_MAX_SIZE)
+        self._last_used = {}
+
+    @property
+    def closed(self) -> bool:
+        return self._pool.closed
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < settings.DB_POOL_PING_AFTER:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=settings.DB_POOL_TIMEOUT):
+            raise TimeoutError("Timed out waiting for a database connection")
+        try:
+            conn = self._pool.getconn()
+            if not self._healthy(conn):
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False) -> None:
+        try:
+            if not broken and not conn.closed:
+                try:
+                    conn.rollback()  # leave no open transaction behind
+                except psycopg2.Error:
+                    broken = True
+            if broken or conn.closed:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            if not self._pool.closed:
+                self._pool.putconn(conn, close=broken or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        if not self._pool.closed:
+            self._pool.closeall()
+
+
+# {config_fingerprint: _BoundedPool}
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(db_config) -> _BoundedPool:
+    key = config_fingerprint(db_config)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = _BoundedPool(dict(db_config))
+            _pools[key] = pool
+    return pool
+
+
+@contextmanager
+def connection(db_config):
+    """
+    Borrow a pooled connection for db_config; it is rolled back and returned on exit.
+    """
+    pool = get_pool(db_config)
+    conn = pool.acquire()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.release(conn, broken)
+
+
+def close_pool(db_config) -> None:
+    with _lock:
+        pool = _pools.pop(config_fingerprint(db_config), None)
+    if pool:
+        pool.close()
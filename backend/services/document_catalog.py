@@ -0,0 +1,121 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import select, tuple_, and_, or_
+
+from config import settings
+from db import Documents
+from .qdrant_store import document_point_counts, count_document_points, delete_document
+
+# Documents still being (re-)indexed; their chunk counts are expected to drift
+_IN_FLIGHT = ("pending", "processing")
+
+
+def encode_cursor(created_at, document_id: str) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, document_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    (created_at, document_id) of the last row of the previous page; ValueError if malformed.
+    """
+    try:
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(document_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def _item(rec: Documents) -> dict:
+    return {
+        "document_id": rec.id,
+        "filename": rec.file_url.rsplit("/", 1)[-1] if rec.file_url else None,
+        "status": rec.status,
+        "chunks": rec.chunks or 0,
+        "created_at": rec.created_at.isoformat() if rec.created_at else None,
+    }
+
+
+def list_page(db, limit: int, cursor: str = None, statuses=None):
+    """
+    One newest-first page of the documents table: (items, next_cursor).
+
+    Keyset pagination on (created_at, id), served by the ix_documents_* indexes,
+    so deep pages cost the same as the first. next_cursor is None on the last page.
+    """
+    stmt = select(Documents)
+    if statuses:
+        stmt = stmt.where(Documents.status.in_(statuses))
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        if created_at is None:
+            # Postgres sorts NULL created_at first in DESC order
+            stmt = stmt.where(or_(
+                and_(Documents.created_at.is_(None), Documents.id < document_id),
+                Documents.created_at.isnot(None),
+            ))
+        else:
+            stmt = stmt.where(tuple_(Documents.created_at, Documents.id) < (created_at, document_id))
+    stmt = stmt.order_by(Documents.created_at.desc(), Documents.id.desc()).limit(limit + 1)
+
+    rows = db.execute(stmt).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_item(r) for r in rows], next_cursor
+
+
+def reconcile(db, client, collection: str = None, delete_orphans: bool = False) -> dict:
+    """
+    Compare the documents table with what Qdrant actually holds.
+
+    - settled rows whose chunk count differs from their point count get the
+      count corrected (a row with no points at all is marked "error"); rows
+      recorded with 0 chunks are empty documents and are left alone
+    - points whose document_id has no row are reported as orphans and, with
+      delete_orphans, removed
+
+    The collection-wide counts only pick candidates: each one's row is re-read
+    (locked) and its points re-counted right before it is changed, so a
+    document that was re-indexed meanwhile is judged on fresh numbers.
+    """
+    collection = collection or settings.COLLECTION_NAME
+    counts = document_point_counts(client, collection)
+    report = {"documents": 0, "points": sum(counts.values()), "corrected": [], "missing": [], "orphans": []}
+
+    suspects = []
+    for rec in db.execute(select(Documents)).scalars():
+        report["documents"] += 1
+        stored = counts.pop(rec.id, 0)
+        if rec.status in _IN_FLIGHT or rec.status == "error" or not rec.chunks:
+            continue
+        if stored != rec.chunks:
+            suspects.append(rec.id)
+    db.commit()
+
+    for document_id in suspects:
+        # lock first: a settled row's points are complete, and a re-upload
+        # cannot reset it to pending until this commit
+        rec = db.get(Documents, document_id, populate_existing=True, with_for_update=True)
+        if rec is None or rec.status in _IN_FLIGHT or rec.status == "error" or not rec.chunks:
+            db.rollback()
+            continue
+        stored = count_document_points(client, collection, document_id)
+        if stored == 0:
+            report["missing"].append(rec.id)
+            rec.status = "error"
+        elif stored != rec.chunks:
+            report["corrected"].append({"document_id": rec.id, "chunks": rec.chunks, "points": stored})
+            rec.chunks = stored
+        db.commit()
+
+    # a row inserted after the walk is not an orphan
+    report["orphans"] = sorted(d for d in counts if db.get(Documents, d) is None)
+    db.commit()
+    if delete_orphans:
+        for document_id in report["orphans"]:
+            delete_document(client, collection, document_id)
+    return report
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+import redis
+
+from config import settings
+from .lru import LRUCache
+from .redis_client import get_redis, mark_failed
+
+# Queries: per-process LRU of vectors. Chunks: shared store of raw float32 bytes
+# (Redis or a directory on disk), keyed by content hash and namespaced by model.
+_query_cache = LRUCache(settings.EMBED_QUERY_CACHE_SIZE)
+_stats = {"hits": 0, "misses": 0, "bytes_stored": 0, "store_errors": 0}
+_stats_lock = threading.Lock()
+
+_REDIS_PREFIX = "querycraft:emb:"
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def content_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+def _disk_path(key: str) -> str:
+    model_name, digest = key.rsplit(":", 1)
+    namespace = model_name.replace("/", "__")
+    return os.path.join(settings.EMBED_CACHE_DIR, namespace, digest[:2], f"{digest}.f32")
+
+
+def _disk_get_many(keys):
+    out = []
+    for key in keys:
+        try:
+            with open(_disk_path(key), "rb") as f:
+                out.append(f.read())
+        except FileNotFoundError:
+            out.append(None)
+    return out
+
+
+def _disk_put_many(items) -> None:
+    for key, raw in items:
+        path = _disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename so concurrent workers never read a partial vector
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+
+def _redis_get_many(keys):
+    client = get_redis()
+    if client is None:
+        return [None] * len(keys)
+    try:
+        return client.mget([_REDIS_PREFIX + k for k in keys])
+    except redis.RedisError as e:
+        mark_failed(e, "Embed Cache")
+        return [None] * len(keys)
+
+
+def _redis_put_many(items) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key, raw in items:
+            pipe.set(_REDIS_PREFIX + key, raw, ex=settings.EMBED_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        mark_failed(e, "Embed Cache")
+        raise
+
+
+def lookup_many(model_name: str, texts):
+    """
+    Cached vectors for texts (None where missing), from the shared chunk store.
+    """
+    backend = settings.EMBED_CACHE_BACKEND
+    if backend == "none" or not texts:
+        return [None] * len(texts)
+    keys = [content_key(model_name, t) for t in texts]
+    raws = _redis_get_many(keys) if backend == "redis" else _disk_get_many(keys)
+    vectors = [np.frombuffer(raw, dtype=np.float32) if raw else None for raw in raws]
+    hits = sum(v is not None for v in vectors)
+    _count("hits", hits)
+    _count("misses", len(vectors) - hits)
+    return vectors
+
+
+def store_many(model_name: str, texts, vectors) -> None:
+    backend = settings.EMBED_CACHE_BACKEND
+    if backend == "none" or not texts:
+        return
+    items = [
+        (content_key(model_name, t), np.asarray(v, dtype=np.float32).tobytes())
+        for t, v in zip(texts, vectors)
+    ]
+    try:
+        if backend == "redis":
+            _redis_put_many(items)
+        else:
+            _disk_put_many(items)
+        _count("bytes_stored", sum(len(raw) for _, raw in items))
+    except Exception as e:
+        _count("store_errors")
+        print(f"[Embed Cache] store failed: {e}")
+
+
+def query_lookup(model_name: str, text: str):
+    return _query_cache.get(content_key(model_name, text))
+
+
+def query_store(model_name: str, text: str, vector) -> None:
+    _query_cache.set(content_key(model_name, text), np.asarray(vector, dtype=np.float32))
+
+
+def stats():
+    with _stats_lock:
+        counts = dict(_stats)
+    lookups = counts["hits"] + counts["misses"]
+    return {
+        "backend": settings.EMBED_CACHE_BACKEND,
+        "chunks": {
+            **counts,
+            "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else 0.0,
+        },
+        "queries": _query_cache.stats(),
+    }
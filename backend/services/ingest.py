@@ -1,9 +1,39 @@
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 import fitz
 from docx import Document
 import pypandoc
 
+from config import settings
+
+# Extractor registry: extension / MIME type -> function(path) yielding text pieces (pages, paragraphs, lines)
+_EXTRACTORS_BY_EXT = {}
+_EXTRACTORS_BY_MIME = {}
+
+def register_extractor(extensions, mime_types=()):
+    def decorator(fn):
+        for ext in extensions:
+            _EXTRACTORS_BY_EXT[ext.lower()] = fn
+        for mime in mime_types:
+            _EXTRACTORS_BY_MIME[mime.lower()] = fn
+        return fn
+    return decorator
+
+def get_extractor(filename: str = None, mime_type: str = None):
+    """
+    Pick the piece iterator for a file, by extension first and MIME type second.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    fn = _EXTRACTORS_BY_EXT.get(ext) or _EXTRACTORS_BY_MIME.get((mime_type or "").lower())
+    if fn is None:
+        raise ValueError(f"Unsupported file format: {filename or mime_type}")
+    return fn
+
 def extract_text_from_pdf(file_path):
     text = []
     with fitz.open(file_path) as doc:
@@ -19,6 +49,140 @@ def extract_text_from_pdf_stream(body):
             text.append(page.get_text())
     return "\n".join(text)
 
+def spool_stream(body, suffix: str = "", chunk_size: int = 1024 * 1024) -> str:
+    """
+    Copy a (S3) stream to a temp file in fixed-size chunks and return its path.
+    The caller is responsible for removing the file.
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="qc-ingest-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(body, out, chunk_size)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+_pdf_pool_disabled_logged = False
+
+def _daemonic() -> bool:
+    if multiprocessing.current_process().daemon:
+        return True
+    try:
+        import billiard  # Celery's prefork pool tracks its children here
+    except ImportError:
+        return False
+    return bool(billiard.current_process().daemon)
+
+def _parallel_pdf_enabled() -> bool:
+    """
+    PDF_PARALLEL_EXTRACT: "true", "false" or "auto" (default), which turns the
+    pool off in daemonic processes such as Celery prefork children: they may
+    not start child processes, so every attempt would fail and fall back.
+    run_worker.py runs the extract stage on a thread pool so it is available.
+    """
+    global _pdf_pool_disabled_logged
+    mode = settings.PDF_PARALLEL_EXTRACT
+    if mode in ("true", "false"):
+        return mode == "true"
+    if _daemonic():
+        if not _pdf_pool_disabled_logged:
+            print("[Ingest] Parallel PDF extraction disabled in this daemonic worker process; "
+                  "extracting pages sequentially")
+            _pdf_pool_disabled_logged = True
+        return False
+    return True
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # forkserver: the pool may be started from a threaded Celery worker,
+            # whose other threads' locks and sockets must not be forked
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+            )
+    return _pdf_pool
+
+def _reset_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_pdf_range(file_path, start, stop):
+    # Runs in a pool process: each worker opens its own handle on the spooled file
+    with fitz.open(file_path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+def _iter_pdf_pages_parallel(file_path, page_count):
+    """
+    Fan page ranges out to the process pool and yield pages in order,
+    keeping at most 2 ranges per worker in flight.
+    """
+    pool = _get_pdf_pool()
+    step = settings.PDF_PAGES_PER_TASK
+    ranges = [(s, min(s + step, page_count)) for s in range(0, page_count, step)]
+    window = settings.PDF_EXTRACT_WORKERS * 2
+    pending = [pool.submit(_extract_pdf_range, file_path, s, e) for s, e in ranges[:window]]
+    next_range = len(pending)
+    while pending:
+        pages = pending.pop(0).result()
+        if next_range < len(ranges):
+            s, e = ranges[next_range]
+            pending.append(pool.submit(_extract_pdf_range, file_path, s, e))
+            next_range += 1
+        yield from pages
+
+@register_extractor([".pdf"], ["application/pdf"])
+def iter_pdf_pages(file_path):
+    """
+    Yield page texts one at a time; only the current page (or the in-flight
+    page ranges, for large documents extracted in parallel) is held in memory.
+    """
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+    if page_count == 0:
+        return
+    if (settings.PDF_EXTRACT_WORKERS > 1 and page_count >= settings.PDF_PARALLEL_MIN_PAGES
+            and _parallel_pdf_enabled()):
+        pages = _iter_pdf_pages_parallel(file_path, page_count)
+        try:
+            # Pool start-up problems surface on the first page; fall back to
+            # sequential extraction only then, never after pages were yielded
+            first = next(pages)
+        except Exception as e:
+            print(f"[Ingest] Parallel PDF extraction unavailable, extracting {page_count} pages "
+                  f"sequentially: {e!r}")
+            _reset_pdf_pool()
+            pages = None
+        if pages is not None:
+            yield first
+            yield from pages
+            return
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            yield page.get_text()
+
+@register_extractor([".docx"], ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"])
+def iter_docx_paragraphs(file_path):
+    for p in Document(file_path).paragraphs:
+        yield p.text
+
+@register_extractor([".odt"], ["application/vnd.oasis.opendocument.text"])
+def iter_odt_text(file_path):
+    yield extract_text_from_odt(file_path)
+
+@register_extractor([".txt", ".md"], ["text/plain", "text/markdown"])
+def iter_txt_lines(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
 def extract_text_from_docx(file_path):
     doc = Document(file_path)
     return "\n".join(p.text for p in doc.paragraphs)
@@ -33,16 +197,7 @@ def extract_text_from_txt(file_path):
 def extract_text(file_path: str) -> str:
     if not os.path.exists(file_path):
         raise FileNotFoundError(file_path)
-    lower = file_path.lower()
-    if lower.endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
-    if lower.endswith(".docx"):
-        return extract_text_from_docx(file_path)
-    if lower.endswith(".odt"):
-        return extract_text_from_odt(file_path)
-    if lower.endswith(".txt"):
-        return extract_text_from_txt(file_path)
-    raise ValueError("Unsupported file format")
+    return "\n".join(get_extractor(file_path)(file_path))
 
 def make_document_id(filename: str) -> str:
     stem = os.path.splitext(os.path.basename(filename))[0]
@@ -0,0 +1,70 @@
+import io
+import json
+
+import numpy as np
+
+from config import settings
+from s3_client import put_bytes, get_bytes, object_exists, delete_prefix
+
+# Checkpoints of the staged ingestion pipeline, in the documents bucket:
+#   artifacts/{document_id}/{etag}/manifest.json        written last by the extract stage
+#   artifacts/{document_id}/{etag}/chunks/{batch}.json  {"chunks": texts of one batch, "new": positions
+#                                                        of the chunks not stored in Qdrant yet}
+#   artifacts/{document_id}/{etag}/vectors/{batch}.npy  float32 vectors of the batch's new chunks
+# Keyed by the source object's ETag, so a retry (or a re-upload of identical
+# bytes) finds the work already done; a changed file starts a fresh prefix.
+# Deleted once the document is indexed or its ingestion fails for good.
+
+
+def artifact_prefix(document_id: str, etag: str) -> str:
+    return f"artifacts/{document_id}/{etag}/"
+
+
+def _batch_key(prefix: str, kind: str, batch_no: int, ext: str) -> str:
+    return f"{prefix}{kind}/{batch_no:05d}.{ext}"
+
+
+def get_manifest(prefix: str):
+    raw = get_bytes(settings.S3_BUCKET, prefix + "manifest.json")
+    return json.loads(raw) if raw else None
+
+
+def put_manifest(prefix: str, manifest: dict) -> None:
+    put_bytes(settings.S3_BUCKET, prefix + "manifest.json", json.dumps(manifest).encode(), "application/json")
+
+
+def put_chunks(prefix: str, batch_no: int, chunks, new) -> None:
+    data = json.dumps({"chunks": chunks, "new": new}, ensure_ascii=False).encode("utf-8")
+    put_bytes(settings.S3_BUCKET, _batch_key(prefix, "chunks", batch_no, "json"), data, "application/json")
+
+
+def get_chunks(prefix: str, batch_no: int):
+    """
+    (chunks, positions of the new chunks) of one batch.
+    """
+    raw = get_bytes(settings.S3_BUCKET, _batch_key(prefix, "chunks", batch_no, "json"))
+    if raw is None:
+        raise FileNotFoundError(f"missing chunk batch {batch_no} under {prefix}")
+    batch = json.loads(raw)
+    return batch["chunks"], batch["new"]
+
+
+def has_vectors(prefix: str, batch_no: int) -> bool:
+    return object_exists(settings.S3_BUCKET, _batch_key(prefix, "vectors", batch_no, "npy"))
+
+
+def put_vectors(prefix: str, batch_no: int, vectors) -> None:
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(vectors, dtype=np.float32))
+    put_bytes(settings.S3_BUCKET, _batch_key(prefix, "vectors", batch_no, "npy"), buf.getvalue())
+
+
+def get_vectors(prefix: str, batch_no: int) -> np.ndarray:
+    raw = get_bytes(settings.S3_BUCKET, _batch_key(prefix, "vectors", batch_no, "npy"))
+    if raw is None:
+        raise FileNotFoundError(f"missing vector batch {batch_no} under {prefix}")
+    return np.load(io.BytesIO(raw))
+
+
+def delete(prefix: str) -> None:
+    delete_prefix(settings.S3_BUCKET, prefix)
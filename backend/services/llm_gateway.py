@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from config import settings
+
+# One pooled client per API key (sync and async), shared by every call site.
+# Retries with exponential backoff on 429/5xx/connection errors are handled by
+# the SDK (max_retries); keep-alive and pool size come from the httpx limits.
+_clients = {}
+_async_clients = {}
+_lock = threading.Lock()
+
+_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+_async_slots = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+# {purpose: {"calls", "errors", "prompt_tokens", "completion_tokens", "latency_ms_total", "latency_ms_max"}}
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_client(api_key: str = None) -> OpenAI:
+    key = api_key or settings.OPENAI_API_KEY
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(
+                api_key=key,
+                max_retries=settings.LLM_MAX_RETRIES,
+                timeout=settings.LLM_TIMEOUT,
+                http_client=DefaultHttpxClient(limits=_limits()),
+            )
+            _clients[key] = client
+    return client
+
+
+def get_async_client(api_key: str = None) -> AsyncOpenAI:
+    key = api_key or settings.OPENAI_API_KEY
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=key,
+                max_retries=settings.LLM_MAX_RETRIES,
+                timeout=settings.LLM_TIMEOUT,
+                http_client=DefaultAsyncHttpxClient(limits=_limits()),
+            )
+            _async_clients[key] = client
+    return client
+
+
+def _record(purpose: str, started: float, usage=None, failed: bool = False) -> None:
+    latency_ms = (time.perf_counter() - started) * 1000
+    with _metrics_lock:
+        m = _metrics.setdefault(purpose, {
+            "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+        })
+        m["calls"] += 1
+        m["errors"] += int(failed)
+        m["latency_ms_total"] += latency_ms
+        m["latency_ms_max"] = max(m["latency_ms_max"], latency_ms)
+        if usage is not None:
+            m["prompt_tokens"] += usage.prompt_tokens or 0
+            m["completion_tokens"] += usage.completion_tokens or 0
+
+
+def chat(messages, model: str, purpose: str = "default", api_key: str = None, **kwargs) -> str:
+    """
+    Blocking chat completion through the shared client; returns the message text.
+    """
+    client = get_client(api_key)
+    with _slots:
+        started = time.perf_counter()
+        try:
+            resp = client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except Exception:
+            _record(purpose, started, failed=True)
+            raise
+    _record(purpose, started, resp.usage)
+    return resp.choices[0].message.content
+
+
+def chat_stream(messages, model: str, purpose: str = "default", api_key: str = None, **kwargs):
+    """
+    Streaming chat completion; yields text deltas. Holds a concurrency slot
+    until the stream is exhausted or closed.
+    """
+    client = get_client(api_key)
+    with _slots:
+        started = time.perf_counter()
+        usage = None
+        try:
+            stream = client.chat.completions.create(
+                model=model, messages=messages, stream=True,
+                stream_options={"include_usage": True}, **kwargs,
+            )
+        except Exception:
+            _record(purpose, started, failed=True)
+            raise
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            _record(purpose, started, usage, failed=True)
+            raise
+        finally:
+            stream.close()
+        _record(purpose, started, usage)
+
+
+def _loop_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _async_slots.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _async_slots[loop] = sem
+    return sem
+
+
+async def achat(messages, model: str, purpose: str = "default", api_key: str = None, **kwargs) -> str:
+    """
+    Async counterpart of chat() using the pooled AsyncOpenAI client.
+    """
+    client = get_async_client(api_key)
+    async with _loop_slots():
+        started = time.perf_counter()
+        try:
+            resp = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except Exception:
+            _record(purpose, started, failed=True)
+            raise
+    _record(purpose, started, resp.usage)
+    return resp.choices[0].message.content
+
+
+def stats():
+    with _metrics_lock:
+        return {
+            purpose: {
+                **{k: v for k, v in m.items() if k != "latency_ms_total"},
+                "latency_ms_max": round(m["latency_ms_max"], 1),
+                "latency_ms_avg": round(m["latency_ms_total"] / m["calls"], 1) if m["calls"] else 0.0,
+            }
+            for purpose, m in _metrics.items()
+        }
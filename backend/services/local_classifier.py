@@ -0,0 +1,104 @@
+import re
+
+import numpy as np
+
+from config import settings
+from .chunk_embed import embed_texts
+from .lru import LRUCache
+
+# Words that point at document content rather than table lookups (see classifier_prompt)
+_RAG_CUES = (
+    "explain", "describe", "summarize", "summarise", "what is", "what does",
+    "clause", "section", "policy", "theory", "concept", "define", "definition", "meaning",
+)
+# Column names too common to say anything about the target database
+_GENERIC_COLUMNS = {"id", "name", "type", "date", "status", "created_at", "updated_at", "description"}
+
+# (db_name, schema version) -> (table names, normalised table-description matrix)
+_table_vectors = LRUCache(max_entries=64)
+
+
+def _normalize(text: str) -> str:
+    return " " + " ".join(re.findall(r"[a-z0-9]+", text.lower())) + " "
+
+
+def _variants(name: str):
+    base = name.lower().replace("_", " ").strip()
+    forms = {base}
+    if base.endswith("ies"):
+        forms.add(base[:-3] + "y")
+    elif base.endswith("s"):
+        forms.add(base[:-1])
+    else:
+        forms.add(base + "s")
+    return forms
+
+
+def _mentions(q_norm: str, name: str) -> bool:
+    return any(f" {form} " in q_norm for form in _variants(name))
+
+
+def _table_text(table) -> str:
+    cols = ", ".join(c["name"].replace("_", " ") for c in table["columns"])
+    desc = table.get("description") or ""
+    return f"{table['name'].replace('_', ' ')}: {cols}. {desc}".strip()
+
+
+def _table_matrix(db_name, schema):
+    key = (db_name, schema.get("version"))
+    cached = _table_vectors.get(key)
+    if cached is None:
+        tables = schema.get("tables", [])
+        texts = [_table_text(t) for t in tables]
+        matrix = embed_texts(texts, settings.EMBED_MODEL) if texts else np.zeros((0, 1), dtype=np.float32)
+        cached = ([t["name"] for t in tables], matrix)
+        _table_vectors.set(key, cached)
+    return cached
+
+
+def classify_locally(query, all_schemas, query_vector=None):
+    """
+    Sub-millisecond first tier for classify_query.
+
+    Scores each database by table/column names mentioned in the query and by
+    embedding similarity of the query to its table descriptions. Returns a
+    decision dict only when it is unambiguous, otherwise None (defer to the LLM).
+    """
+    if not all_schemas:
+        return None
+    q_norm = _normalize(query)
+    rag_cue = any(f" {cue} " in q_norm for cue in _RAG_CUES)
+    if query_vector is None:
+        query_vector = embed_texts([query], settings.EMBED_MODEL)[0]
+    query_vector = np.asarray(query_vector, dtype=np.float32)
+
+    scores = []
+    for db_name, schema in all_schemas.items():
+        tables = schema.get("tables", [])
+        table_hits = sum(1 for t in tables if _mentions(q_norm, t["name"]))
+        column_names = {
+            c["name"] for t in tables for c in t["columns"]
+            if len(c["name"]) >= 4 and c["name"].lower() not in _GENERIC_COLUMNS
+        }
+        column_hits = sum(1 for c in column_names if _mentions(q_norm, c))
+        _, matrix = _table_matrix(db_name, schema)
+        sim = float(np.max(matrix @ query_vector)) if len(matrix) else 0.0
+        scores.append((table_hits, column_hits, sim, db_name))
+
+    scores.sort(reverse=True)
+    best = scores[0]
+    runner_up = scores[1] if len(scores) > 1 else None
+
+    if (
+        not rag_cue
+        and best[0] > 0
+        and (runner_up is None or best[0] > runner_up[0])
+        and best[2] >= settings.LOCAL_CLASSIFIER_MIN_SIM
+    ):
+        return {"mode": "SQL", "db_name": best[3]}
+
+    no_name_hits = all(s[0] == 0 and s[1] == 0 for s in scores)
+    if rag_cue and no_name_hits and max(s[2] for s in scores) < settings.LOCAL_CLASSIFIER_RAG_MAX_SIM:
+        return {"mode": "RAG", "db_name": None}
+
+    return None
@@ -1,23 +1,107 @@
+import hashlib
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
+import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, PayloadSchemaType
+from qdrant_client.models import (
+    Distance, VectorParams, Batch, Filter, FieldCondition, MatchValue, PayloadSchemaType,
+    PointIdsList, SetPayload, SetPayloadOperation, HnswConfigDiff, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig,
+    SearchParams, QuantizationSearchParams, VectorParamsDiff, CollectionParamsDiff, Disabled,
+)
+from config import settings
 from .chunk_embed import embedding_dim
+from . import vector_replica
+
+# Namespace for content-addressed point ids (never change: ids would stop matching)
+_POINT_ID_NAMESPACE = uuid.UUID("6f1c9a52-3d4e-4b8f-9a57-2c0d8e1b7f43")
+
+# Collection tuning profiles (QDRANT_PROFILE). "default" keeps Qdrant's defaults
+# (float32 vectors and payloads in RAM, m=16, ef_construct=100), i.e. what
+# collections created before profiles have. Quantized profiles keep the
+# compressed vectors in RAM and rescore the oversampled candidates with the
+# on-disk originals. Compare them with benchmarks/bench_qdrant_profiles.py.
+COLLECTION_PROFILES = {
+    "default": {},
+    "scalar": {
+        "quantization": "scalar", "oversampling": 2.0, "m": 16, "ef_construct": 128, "hnsw_ef": 64,
+        "on_disk_vectors": True, "on_disk_payload": True,
+    },
+    "binary": {
+        "quantization": "binary", "oversampling": 3.0, "m": 16, "ef_construct": 128, "hnsw_ef": 96,
+        "on_disk_vectors": True, "on_disk_payload": True,
+    },
+    "fast": {
+        "quantization": "scalar", "oversampling": 1.5, "m": 32, "ef_construct": 256, "hnsw_ef": 128,
+        "on_disk_vectors": False, "on_disk_payload": True,
+    },
+}
 
 def get_qdrant_client(host=None, port=None, url=None, api_key=None,timeout: float = 30.0) -> QdrantClient:
     if url:
-        return QdrantClient(url=url, api_key=api_key, prefer_grpc=False, timeout=timeout)
-    return QdrantClient(host=host or "localhost", port=int(port or 6333), timeout=timeout)
+        return QdrantClient(url=url, api_key=api_key, prefer_grpc=settings.QDRANT_PREFER_GRPC, timeout=timeout)
+    return QdrantClient(host=host or "localhost", port=int(port or 6333),
+                        prefer_grpc=settings.QDRANT_PREFER_GRPC, timeout=timeout)
+
+def get_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    name = name or settings.QDRANT_PROFILE
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown Qdrant profile '{name}' (choose from {', '.join(COLLECTION_PROFILES)})")
+    return COLLECTION_PROFILES[name]
+
+
+# Fail at import (API and worker startup) on a bad QDRANT_PROFILE, not on the first query
+get_profile(settings.QDRANT_PROFILE)
+
+
+def _quantization_config(profile):
+    kind = profile.get("quantization")
+    if kind == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def _hnsw_config(profile):
+    if "m" not in profile and "ef_construct" not in profile:
+        return None
+    return HnswConfigDiff(m=profile.get("m"), ef_construct=profile.get("ef_construct"))
+
+
+def search_params(profile_name: Optional[str] = None) -> Optional[SearchParams]:
+    """
+    Query-time parameters matching a profile (hnsw ef, quantized search with rescoring).
+    """
+    profile = get_profile(profile_name)
+    if not profile:
+        return None
+    quantization = None
+    if profile.get("quantization"):
+        quantization = QuantizationSearchParams(rescore=True, oversampling=profile.get("oversampling"))
+    return SearchParams(hnsw_ef=profile.get("hnsw_ef"), quantization=quantization)
 
-def ensure_collection(client: QdrantClient, collection_name: str, vector_size: int):
+
+def ensure_collection(client: QdrantClient, collection_name: str, vector_size: Optional[int],
+                      profile: Optional[str] = None):
+    """
+    Create the collection with the tuning profile if it is missing; an existing
+    collection keeps its configuration (see apply_profile to migrate it).
+    vector_size is only used when creating it.
+    """
     collections = [c.name for c in client.get_collections().collections]
     if collection_name not in collections:
-        client.recreate_collection(
+        tuning = get_profile(profile)
+        client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
-            payload_schema={
-                "document_id": PayloadSchemaType.KEYWORD
-            }
+            vectors_config=VectorParams(
+                size=vector_size, distance=Distance.COSINE, on_disk=tuning.get("on_disk_vectors"),
+            ),
+            hnsw_config=_hnsw_config(tuning),
+            quantization_config=_quantization_config(tuning),
+            on_disk_payload=tuning.get("on_disk_payload"),
         )
 
     # Ensure document_id is indexed for filtering
@@ -31,6 +115,104 @@ def ensure_collection(client: QdrantClient, collection_name: str, vector_size: i
         print(f"Payload index creation skipped (probably exists): {e}")
 
 
+def apply_profile(client: QdrantClient, collection_name: str, profile: Optional[str] = None):
+    """
+    Switch an existing collection to a profile in place. Qdrant rebuilds the
+    index / quantized vectors in the background; search keeps working meanwhile.
+    """
+    tuning = get_profile(profile)
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": VectorParamsDiff(on_disk=tuning.get("on_disk_vectors", False))},
+        hnsw_config=_hnsw_config(tuning) or HnswConfigDiff(m=16, ef_construct=100),
+        # None would mean "unchanged": switching to an unquantized profile has to disable it
+        quantization_config=_quantization_config(tuning) or Disabled.DISABLED,
+        collection_params=CollectionParamsDiff(on_disk_payload=tuning.get("on_disk_payload", False)),
+    )
+
+
+def chunk_point_id(document_id: str, text: str) -> str:
+    """
+    Deterministic point id: the same chunk of the same document always maps
+    to the same point, so re-uploads overwrite instead of duplicating.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_POINT_ID_NAMESPACE, f"{document_id}:{digest}"))
+
+
+def _doc_filter(document_id: str) -> Filter:
+    return Filter(must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))])
+
+
+def existing_chunk_indexes(client: QdrantClient, collection: str, document_id: str) -> Dict[str, int]:
+    """
+    {point_id: chunk_index} for every point of a document (no vectors or text
+    fetched); empty while the collection does not exist yet.
+    """
+    if not client.collection_exists(collection):
+        return {}
+    found = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection,
+            scroll_filter=_doc_filter(document_id),
+            with_payload=["chunk_index"],
+            with_vectors=False,
+            limit=1024,
+            offset=offset,
+        )
+        for point in points:
+            found[str(point.id)] = (point.payload or {}).get("chunk_index")
+        if offset is None:
+            return found
+
+
+def delete_points(client: QdrantClient, collection: str, ids: List[str]):
+    ids = list(ids)
+    for s in range(0, len(ids), 1000):
+        client.delete(collection_name=collection, points_selector=PointIdsList(points=ids[s:s + 1000]))
+
+
+def set_chunk_indexes(client: QdrantClient, collection: str, indexes: Dict[str, int]):
+    """
+    Re-number kept chunks in one batched request instead of re-upserting them.
+    """
+    if not indexes:
+        return
+    client.batch_update_points(
+        collection_name=collection,
+        update_operations=[
+            SetPayloadOperation(set_payload=SetPayload(payload={"chunk_index": idx}, points=[pid]))
+            for pid, idx in indexes.items()
+        ],
+    )
+
+
+def _upsert_batch(client: QdrantClient, collection: str, ids, vectors: np.ndarray, payloads, wait: bool):
+    """
+    Send one batch, retrying with exponential backoff. Point ids are fixed
+    before the first attempt, so a retry overwrites rather than duplicates.
+    """
+    retries = settings.QDRANT_UPSERT_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            # The float32 slice is converted only here; over gRPC it goes out as
+            # packed floats, over REST as JSON arrays
+            client.upsert(
+                collection_name=collection,
+                points=Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads),
+                wait=wait,
+            )
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = settings.QDRANT_UPSERT_BACKOFF * (2 ** attempt)
+            print(f"Upsert batch failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
 def upsert_chunks(
     client: QdrantClient,
     collection: str,
@@ -38,20 +220,46 @@ def upsert_chunks(
     chunks: List[str],
     document_id: str,
     source_name: str,
+    start_index: int = 0,
+    chunk_indexes: Optional[List[int]] = None,
 ):
-    points = []
-    for i, (vec, text) in enumerate(zip(vectors, chunks)):
-        points.append(PointStruct(
-            id=str(uuid.uuid4()),
-            vector=vec,
-            payload={
-                "document_id": document_id,
-                "chunk_index": i,
-                "source": source_name,
-                "text": text,
-            }
-        ))
-    client.upsert(collection_name=collection, points=points)
+    """
+    Upsert chunks in QDRANT_UPSERT_BATCH_SIZE batches with up to
+    QDRANT_UPSERT_PARALLEL requests in flight. chunk_indexes overrides the
+    contiguous numbering from start_index (used when only some chunks changed).
+    """
+    # Vectors stay a float32 matrix; each batch is converted only when it is sent
+    vectors = np.asarray(vectors, dtype=np.float32)
+    ids = [chunk_point_id(document_id, text) for text in chunks]
+    if chunk_indexes is None:
+        chunk_indexes = range(start_index, start_index + len(chunks))
+    payloads = [
+        {
+            "document_id": document_id,
+            "chunk_index": i,
+            "source": source_name,
+            "text": text,
+        }
+        for i, text in zip(chunk_indexes, chunks)
+    ]
+    if not ids:
+        return
+
+    size = settings.QDRANT_UPSERT_BATCH_SIZE
+    spans = [(s, min(s + size, len(ids))) for s in range(0, len(ids), size)]
+    if len(spans) == 1:
+        _upsert_batch(client, collection, ids, vectors, payloads, wait=True)
+        return
+
+    # Every batch is sent with wait=True, so once all futures resolve every point
+    # is applied and searchable; callers may count points right after this returns
+    with ThreadPoolExecutor(max_workers=settings.QDRANT_UPSERT_PARALLEL) as pool:
+        futures = [
+            pool.submit(_upsert_batch, client, collection, ids[s:e], vectors[s:e], payloads[s:e], True)
+            for s, e in spans
+        ]
+        for f in futures:
+            f.result()
 
 def search_chunks(
     client: QdrantClient,
@@ -59,13 +267,31 @@ def search_chunks(
     query_vector,
     limit: int = 5,
     filter_by_doc: Optional[str] = None,
+    with_vectors: bool = False,
+    profile: Optional[str] = None,
 ):
+    # Local memory-mapped replica first (None when disabled, stale or missing)
+    if collection == settings.COLLECTION_NAME:
+        hits = vector_replica.search(query_vector, limit, filter_by_doc, with_vectors)
+        if hits is not None:
+            return hits
+
     flt = None
     if filter_by_doc:
         flt = Filter(
             must=[FieldCondition(key="document_id", match=MatchValue(value=filter_by_doc))]
         )
 
+    def to_hit(point):
+        hit = {
+            "id": str(point.id),
+            "score": float(point.score),
+            "payload": point.payload,
+        }
+        if with_vectors:
+            hit["vector"] = point.vector
+        return hit
+
     # Option 1: Using query_points (recommended for newer versions)
     try:
         results = client.query_points(
@@ -73,17 +299,12 @@ def search_chunks(
             query=query_vector,
             limit=limit,
             with_payload=True,
+            with_vectors=with_vectors,
             query_filter=flt,
+            search_params=search_params(profile),
         )
         
-        return [
-            {
-                "id": str(point.id),
-                "score": float(point.score),
-                "payload": point.payload,
-            }
-            for point in results.points
-        ]
+        return [to_hit(point) for point in results.points]
     except AttributeError:
         # Option 2: Fallback to search method for older versions
         results = client.search(
@@ -91,27 +312,44 @@ def search_chunks(
             query_vector=query_vector,
             limit=limit,
             with_payload=True,
+            with_vectors=with_vectors,
             query_filter=flt,
+            search_params=search_params(profile),
         )
         
-        return [
-            {
-                "id": str(point.id),
-                "score": float(point.score),
-                "payload": point.payload,
-            }
-            for point in results
-        ]
+        return [to_hit(point) for point in results]
+
+def document_point_counts(client: QdrantClient, collection: str) -> Dict[str, int]:
+    """
+    {document_id: number of points} for the whole collection.
+
+    Uses a facet over the indexed document_id field (one request, no payloads);
+    servers without the facet API fall back to scrolling document_id only.
+    """
+    try:
+        resp = client.facet(collection, key="document_id", limit=1_000_000, exact=True)
+        return {str(hit.value): hit.count for hit in resp.hits}
+    except Exception as e:
+        print(f"Facet count unavailable ({e}); scrolling document ids")
+    counts = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection, with_payload=["document_id"], with_vectors=False, limit=4096, offset=offset,
+        )
+        for point in points:
+            doc_id = (point.payload or {}).get("document_id")
+            if doc_id:
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        if offset is None:
+            return counts
+
+def count_document_points(client: QdrantClient, collection: str, document_id: str) -> int:
+    return client.count(collection, count_filter=_doc_filter(document_id), exact=True).count
 
 def list_documents(client: QdrantClient, collection: str):
-    # List unique document_ids (cheap approach: scroll and aggregate)
-    unique = set()
-    for point in client.scroll(collection, with_payload=True, limit=2048)[0]:
-        unique.add(point.payload.get("document_id"))
-    return sorted([u for u in unique if u])
+    # Unique document_ids as seen by Qdrant (the API lists documents from Postgres)
+    return sorted(document_point_counts(client, collection))
 
 def delete_document(client: QdrantClient, collection: str, document_id: str):
-    flt = Filter(
-        must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]
-    )
-    client.delete(collection_name=collection, points_selector=flt)
+    client.delete(collection_name=collection, points_selector=_doc_filter(document_id))
@@ -1,6 +1,9 @@
-import psycopg2
 import psycopg2.extras
 import re
+import uuid
+
+from config import settings
+from . import db_pool
 
 FORBIDDEN = ["insert ", "update ", "delete ", "drop ", "alter ", "create ", ";", "--"]
 
@@ -13,22 +16,42 @@ def validate_sql(sql: str):
             raise ValueError(f"Forbidden SQL token: {kw}")
     return True
 
-def run_query(sql, params, db_config, limit=1000):
-    print("DEBUG in run_query got db_config type:", type(db_config))  # <--- add this
-
+def _to_psycopg2(sql: str) -> str:
     validate_sql(sql)
-
     # Convert $1, $2 → %s for psycopg2
-    sql = re.sub(r"\$\d+", "%s", sql)
+    return re.sub(r"\$\d+", "%s", sql)
 
-    if "limit" not in sql.lower():
-        sql += f" LIMIT {limit}"
+def run_query(sql, params, db_config, limit=None):
+    sql = _to_psycopg2(sql)
 
-    conn = psycopg2.connect(**db_config)
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    if "limit" not in sql.lower():
+        sql += f" LIMIT {limit or settings.SQL_MAX_ROWS}"
 
-    cur.execute(sql, params or None)
-    rows = cur.fetchall()
-    conn.close()
+    with db_pool.connection(db_config) as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(sql, params or None)
+            rows = cur.fetchall()
 
     return rows
+
+def stream_query(sql, params, db_config, max_rows=None, batch_size=None):
+    """
+    Yield rows in batches (lists of dicts) from a named server-side cursor,
+    stopping after max_rows. The connection goes back to the pool when the
+    generator is exhausted or closed.
+    """
+    sql = _to_psycopg2(sql)
+    max_rows = max_rows or settings.SQL_STREAM_MAX_ROWS
+    batch_size = batch_size or settings.SQL_STREAM_BATCH_SIZE
+
+    with db_pool.connection(db_config) as conn:
+        with conn.cursor(name=f"qc_{uuid.uuid4().hex}", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = batch_size
+            cur.execute(sql, params or None)
+            sent = 0
+            while sent < max_rows:
+                rows = cur.fetchmany(min(batch_size, max_rows - sent))
+                if not rows:
+                    break
+                sent += len(rows)
+                yield rows
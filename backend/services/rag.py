@@ -1,8 +1,7 @@
-from openai import OpenAI
+from services import llm_gateway
 
-def make_answer(openai_api_key: str, model: str, question: str, contexts: list) -> str:
-    client = OpenAI(api_key=openai_api_key)
 
+def _build_messages(question: str, contexts: list):
     context_text = "\n\n".join([c["payload"]["text"] for c in contexts])
 
     prompt = f"""You are a helpful assistant.
@@ -15,14 +14,32 @@ Context:
 
 Answer:
 """
+    return [
+        {"role":"system","content":"You are a knowledgeable assistant."},
+        {"role":"user","content": prompt}
+    ]
+
+
+def make_answer(openai_api_key: str, model: str, question: str, contexts: list) -> str:
+    return llm_gateway.chat(
+        _build_messages(question, contexts),
+        model=model,
+        purpose="answer",
+        api_key=openai_api_key,
+        temperature=0.4,
+        max_tokens=400,
+    )
+
 
-    resp = client.chat.completions.create(
+def stream_answer(openai_api_key: str, model: str, question: str, contexts: list):
+    """
+    Same prompt as make_answer, but yields answer text deltas as the model produces them.
+    """
+    return llm_gateway.chat_stream(
+        _build_messages(question, contexts),
         model=model,
-        messages=[
-            {"role":"system","content":"You are a knowledgeable assistant."},
-            {"role":"user","content": prompt}
-        ],
+        purpose="answer",
+        api_key=openai_api_key,
         temperature=0.4,
         max_tokens=400,
     )
-    return resp.choices[0].message.content
@@ -0,0 +1,36 @@
+import threading
+import time
+
+import redis
+
+from config import settings
+
+# Shared client for the caches on the Redis instance Celery already uses.
+# After a connection error, callers skip Redis for a while instead of paying
+# a timeout on every request.
+_client = None
+_down_until = 0.0
+_lock = threading.Lock()
+
+RETRY_AFTER = 30.0
+
+
+def get_redis():
+    """
+    Return the shared Redis client, or None while Redis is marked unavailable.
+    """
+    global _client
+    if time.monotonic() < _down_until:
+        return None
+    with _lock:
+        if _client is None:
+            _client = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25
+            )
+    return _client
+
+
+def mark_failed(e, who: str) -> None:
+    global _down_until
+    _down_until = time.monotonic() + RETRY_AFTER
+    print(f"[{who}] Redis unavailable, skipping it for {RETRY_AFTER:.0f}s: {e}")
@@ -0,0 +1,64 @@
+from typing import List
+
+from .qdrant_store import (
+    chunk_point_id, existing_chunk_indexes, upsert_chunks, delete_points, set_chunk_indexes,
+)
+
+
+class DocumentIndexer:
+    """
+    Incrementally (re-)index one document against what Qdrant already holds.
+
+    Feed chunk batches in order with add_batch(); only chunks whose
+    content-addressed id is not stored yet are embedded and upserted, kept
+    chunks are just re-numbered if their position moved, and finish() deletes
+    points that no longer appear. A first-time upload simply has nothing stored.
+    """
+
+    def __init__(self, client, collection: str, document_id: str, source_name: str):
+        self.client = client
+        self.collection = collection
+        self.document_id = document_id
+        self.source_name = source_name
+        self.existing = existing_chunk_indexes(client, collection, document_id)
+        self.seen = set()
+        self.total = 0
+        self.stats = {"chunks": 0, "embedded": 0, "kept": 0, "renumbered": 0, "deleted": 0}
+
+    @property
+    def points(self) -> int:
+        # distinct chunks, i.e. the document's point count once finished
+        return len(self.seen)
+
+    def add_batch(self, chunks: List[str], embed_fn) -> None:
+        new_texts, new_indexes, moved = [], [], {}
+        for i, text in enumerate(chunks, start=self.total):
+            pid = chunk_point_id(self.document_id, text)
+            if pid in self.seen:
+                continue  # identical chunk earlier in this document
+            self.seen.add(pid)
+            if pid in self.existing:
+                self.stats["kept"] += 1
+                if self.existing[pid] != i:
+                    moved[pid] = i
+            else:
+                new_texts.append(text)
+                new_indexes.append(i)
+        self.total += len(chunks)
+        self.stats["chunks"] = self.total
+
+        if new_texts:
+            vectors = embed_fn(new_texts)
+            upsert_chunks(
+                self.client, self.collection, vectors, new_texts,
+                self.document_id, self.source_name, chunk_indexes=new_indexes,
+            )
+            self.stats["embedded"] += len(new_texts)
+        set_chunk_indexes(self.client, self.collection, moved)
+        self.stats["renumbered"] += len(moved)
+
+    def finish(self):
+        vanished = [pid for pid in self.existing if pid not in self.seen]
+        delete_points(self.client, self.collection, vanished)
+        self.stats["deleted"] = len(vanished)
+        return self.stats
@@ -0,0 +1,192 @@
+import threading
+import time
+
+from config import settings
+
+# Heavy, process-wide resources built on first use instead of at import time.
+# warm_up() builds them in a background thread after the app starts; /ready
+# reports which components are warm. Celery worker processes build them once
+# at boot instead (init_worker_process) and reuse them for every task.
+_lock = threading.Lock()
+_qdrant = None
+_collection_ready = False
+_db_ready = False
+
+# {component: {"ready": bool, "ms": float|None, "error": str|None}}
+_status = {}
+_status_lock = threading.Lock()
+_warmup_thread = None
+
+
+def get_qdrant_client():
+    """
+    Shared Qdrant client, without the collection check of get_qdrant().
+    """
+    global _qdrant
+    if _qdrant is not None:
+        return _qdrant
+    from .qdrant_store import get_qdrant_client as new_client
+
+    with _lock:
+        if _qdrant is None:
+            _qdrant = new_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=30.0)
+    return _qdrant
+
+
+def get_qdrant(dim: int = None):
+    """
+    Shared Qdrant client; the collection is verified (and created if missing)
+    on first use, once per process. dim is the vector size to create it with;
+    without it the size comes from the embedding model, which is only asked
+    (and possibly loaded) when the collection does not exist yet.
+    """
+    global _collection_ready
+    if _collection_ready:
+        return _qdrant
+    from .qdrant_store import ensure_collection
+    from .chunk_embed import embedding_dim
+
+    client = get_qdrant_client()
+    with _lock:
+        if not _collection_ready:
+            if dim is None and not client.collection_exists(settings.COLLECTION_NAME):
+                dim = embedding_dim(settings.EMBED_MODEL)
+            ensure_collection(client, settings.COLLECTION_NAME, dim)
+            _collection_ready = True
+    return client
+
+
+def ensure_db():
+    """
+    Run init_db() once and check the documents database is reachable.
+    """
+    global _db_ready
+    if _db_ready:
+        return
+    from sqlalchemy import text
+    from db import init_db, engine
+
+    with _lock:
+        if not _db_ready:
+            init_db()
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            _db_ready = True
+
+
+def warm_embedder():
+    # Not needed when a shared embedding server owns the model; probing its dim is enough
+    from .chunk_embed import embed_query, embedding_dim
+
+    if settings.EMBED_SERVER_URL:
+        embedding_dim(settings.EMBED_MODEL)
+    else:
+        embed_query("warm up", settings.EMBED_MODEL)
+
+
+def warm_s3():
+    from s3_client import get_s3_client
+
+    get_s3_client()
+
+
+_COMPONENTS = {
+    "embedder": warm_embedder,
+    "qdrant": get_qdrant,
+    "db": ensure_db,
+    "s3": warm_s3,
+}
+
+# Worker-only component: the client without the collection check, for
+# ingestion stages that must not load the embedding model (see run_worker.py)
+_WORKER_COMPONENTS = {"qdrant_client": get_qdrant_client}
+
+
+def _warm(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+        entry = {"ready": True, "error": None}
+    except Exception as e:
+        print(f"[Startup] warm-up of {name} failed: {e}")
+        entry = {"ready": False, "error": str(e)}
+    entry["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    with _status_lock:
+        _status[name] = entry
+
+
+def warm_up(background: bool = True, components=None):
+    """
+    Build every component (or just the named ones); in a daemon thread by
+    default so startup never blocks on a slow dependency. Failed components
+    are retried lazily on the first request that needs them.
+    """
+    global _warmup_thread
+
+    def run():
+        if components is None:
+            selected = _COMPONENTS
+        else:
+            available = {**_COMPONENTS, **_WORKER_COMPONENTS}
+            selected = {name: available[name] for name in components if name in available}
+        for name, fn in selected.items():
+            _warm(name, fn)
+
+    if not background:
+        run()
+        return
+    with _status_lock:
+        if _warmup_thread is not None and _warmup_thread.is_alive():
+            return
+        _warmup_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        _warmup_thread.start()
+
+
+def init_worker_process(components=None):
+    """
+    worker_process_init hook: drop connections inherited from the parent
+    process, then build Qdrant (collection verified), S3, DB and the
+    embedding model once, synchronously, before the first task arrives.
+    components limits that to what the worker's queues need.
+    """
+    global _qdrant, _collection_ready, _db_ready
+    from db import engine
+    import s3_client
+
+    engine.dispose(close=False)  # the parent's pooled sockets must not be shared
+    with _lock:
+        _qdrant, _collection_ready, _db_ready = None, False, False
+    s3_client.reset_client()
+    warm_up(background=False, components=components)
+    with _status_lock:
+        print(f"[Startup] worker process ready: {_status}")
+
+
+def close():
+    """
+    worker_process_shutdown hook: close pooled connections.
+    """
+    global _qdrant, _collection_ready
+    from db import engine
+
+    with _lock:
+        if _qdrant is not None:
+            _qdrant.close()
+        _qdrant, _collection_ready = None, False
+    engine.dispose()
+
+
+def readiness():
+    """
+    {"ready": bool, "components": {...}}; a component warmed lazily by a
+    request (rather than by warm_up) is reported ready as well.
+    """
+    live = {"qdrant": _collection_ready, "db": _db_ready}
+    with _status_lock:
+        components = {}
+        for name in _COMPONENTS:
+            entry = dict(_status.get(name) or {"ready": False, "ms": None, "error": None})
+            if live.get(name):
+                entry["ready"], entry["error"] = True, None
+            components[name] = entry
+    return {"ready": all(c["ready"] for c in components.values()), "components": components}
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from config import settings
+from . import schema_loader
+from .db_pool import config_fingerprint
+
+# Process-wide catalog: {config_fingerprint: entry}
+# entry = {"schema": dict, "version": str, "checked_at": float, "refreshing": bool}
+_catalog = {}
+_lock = threading.Lock()
+
+
+def _load(key, db_config):
+    schema = schema_loader.extract_schema(db_config)
+    entry = {
+        "schema": schema,
+        "version": schema["version"],
+        "checked_at": time.monotonic(),
+        "refreshing": False,
+    }
+    with _lock:
+        _catalog[key] = entry
+    return entry
+
+
+def _refresh(key, db_config):
+    """
+    Background refresh: compare the DDL hash first, re-read columns only if it moved.
+    """
+    try:
+        ddl_hash = schema_loader.get_ddl_hash(db_config)
+        with _lock:
+            entry = _catalog.get(key)
+        if entry is None:
+            return
+        if ddl_hash == entry["version"]:
+            entry["checked_at"] = time.monotonic()
+        else:
+            _load(key, db_config)
+    except Exception as e:
+        print(f"[Schema Refresh Error] {key}: {e}")
+    finally:
+        with _lock:
+            entry = _catalog.get(key)
+            if entry:
+                entry["refreshing"] = False
+
+
+def get_schema(db_config):
+    """
+    Return the cached schema for db_config, loading it on first use.
+    Stale entries are served while a background thread re-validates them.
+    """
+    key = config_fingerprint(db_config)
+    with _lock:
+        entry = _catalog.get(key)
+        stale = (
+            entry is not None
+            and not entry["refreshing"]
+            and time.monotonic() - entry["checked_at"] > settings.SCHEMA_CACHE_TTL
+        )
+        if stale:
+            entry["refreshing"] = True
+
+    if entry is None:
+        return _load(key, db_config)["schema"]
+
+    if stale:
+        threading.Thread(target=_refresh, args=(key, dict(db_config)), daemon=True).start()
+    return entry["schema"]
+
+
+def get_schemas(db_configs):
+    """
+    {db_name: schema_dict} for every config that could be loaded.
+    """
+    all_schemas = {}
+    for db_name, config in db_configs.items():
+        try:
+            all_schemas[db_name] = get_schema(config)
+        except Exception as e:
+            print(f"[Schema Load Error] {db_name}: {e}")
+    return all_schemas
+
+
+def invalidate(db_config) -> None:
+    with _lock:
+        _catalog.pop(config_fingerprint(db_config), None)
+
@@ -1,20 +1,42 @@
-import psycopg2
 import yaml
 import os
 
-def extract_schema_to_yaml(db_config, yaml_path="structured_schema.yaml"):
+from . import db_pool
+
+_COLUMNS_SQL = """
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE table_schema = 'public'
+ORDER BY table_name, ordinal_position;
+"""
+
+# Cheap change check: one md5 over every public column definition in pg_catalog.
+_DDL_HASH_SQL = """
+SELECT md5(coalesce(string_agg(
+    c.relname || '.' || a.attname || ':' || format_type(a.atttypid, a.atttypmod),
+    ',' ORDER BY c.relname, a.attnum
+), ''))
+FROM pg_catalog.pg_attribute a
+JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public'
+  AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+  AND a.attnum > 0
+  AND NOT a.attisdropped;
+"""
+
+
+def fetch_ddl_hash(cur) -> str:
+    cur.execute(_DDL_HASH_SQL)
+    return cur.fetchone()[0]
+
+
+def fetch_schema(cur):
     """
-    Extracts schema from PostgreSQL and saves to YAML.
+    Read public tables/columns with an open cursor.
+    The returned dict carries a "version" (DDL hash) for cache keys.
     """
-    conn = psycopg2.connect(**db_config)
-    cur = conn.cursor()
-
-    cur.execute("""
-    SELECT table_name, column_name, data_type
-    FROM information_schema.columns
-    WHERE table_schema = 'public'
-    ORDER BY table_name, ordinal_position;
-    """)
+    cur.execute(_COLUMNS_SQL)
 
     schema_data = {}
     for table, column, col_type in cur.fetchall():
@@ -22,19 +44,41 @@ def extract_schema_to_yaml(db_config, yaml_path="structured_schema.yaml"):
             schema_data[table] = []
         schema_data[table].append({"name": column, "type": col_type})
 
-    yaml_schema = {
+    return {
+        "version": fetch_ddl_hash(cur),
         "tables": [
             {"name": table, "description": "", "columns": cols}
             for table, cols in schema_data.items()
-        ]
+        ],
     }
 
+
+def extract_schema(db_config):
+    """
+    Extracts schema from PostgreSQL without touching the filesystem.
+    """
+    with db_pool.connection(db_config) as conn:
+        with conn.cursor() as cur:
+            return fetch_schema(cur)
+
+
+def get_ddl_hash(db_config) -> str:
+    with db_pool.connection(db_config) as conn:
+        with conn.cursor() as cur:
+            return fetch_ddl_hash(cur)
+
+
+def extract_schema_to_yaml(db_config, yaml_path="structured_schema.yaml"):
+    """
+    Extracts schema from PostgreSQL and saves to YAML.
+    """
+    schema = extract_schema(db_config)
+    yaml_schema = {"tables": schema["tables"]}
+
     with open(yaml_path, "w") as f:
         yaml.dump(yaml_schema, f, sort_keys=False)
 
-    cur.close()
-    conn.close()
-    return yaml_schema
+    return schema
 
 
 def schema_to_description(schema_dict):
@@ -1,19 +1,14 @@
 import json
-from . import schema_loader
+from . import schema_catalog
 
-def load_db_schemas(db_configs, cache_path="structured_schema.json"):
+def load_db_schemas(db_configs, cache_path=None):
     """
     Given db_configs.json (connection info),
     return a dict of {db_name: schema_dict} with tables/columns.
+    Schemas come from the in-memory catalog; pass cache_path to also dump them to disk.
     """
-    all_schemas = {}
-    for db_name, config in db_configs.items():
-        try:
-            schema = schema_loader.extract_schema_to_yaml(config)
-            all_schemas[db_name] = schema
-        except Exception as e:
-            print(f"[Schema Load Error] {db_name}: {e}")
-    # Optionally save to file for caching
-    with open(cache_path, "w") as f:
-        json.dump(all_schemas, f, indent=2)
+    all_schemas = schema_catalog.get_schemas(db_configs)
+    if cache_path:
+        with open(cache_path, "w") as f:
+            json.dump(all_schemas, f, indent=2)
     return all_schemas
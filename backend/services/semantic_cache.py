@@ -0,0 +1,179 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import redis
+
+from config import settings
+from .redis_client import get_redis, mark_failed
+
+# LRU of answered queries: {entry_id: entry}, most recently used last.
+# entry = {"vector": np.ndarray, "scope": tuple, "response": dict,
+#          "document_ids": set, "db": str|None, "stored_at": float, "computed_at": float}
+#
+# The LRU is per process, so invalidations are also published to Redis as
+# "invalidated at" wall-clock times (all / doc:<id> / db:<name>). A hit is
+# served only if its answer was computed after every invalidation that
+# concerns it, whichever process (API worker or Celery task) invalidated.
+_entries = OrderedDict()
+_ids = itertools.count()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0, "stale": 0}
+
+_REDIS_PREFIX = "querycraft:semantic-cache:invalidated:"
+
+
+def make_scope(db_selection, db_name, filter_document_id, top_k):
+    """
+    Answers are only reused between requests with the same scope.
+    """
+    return (db_selection, db_name if db_selection == "manual" else None, filter_document_id, top_k)
+
+
+def _expired(entry, now) -> bool:
+    return now - entry["stored_at"] > settings.SEMANTIC_CACHE_TTL
+
+
+def _invalidation_keys(entry):
+    keys = ["all"]
+    keys += [f"doc:{d}" for d in entry["document_ids"] | {entry["scope"][2]} if d]
+    keys += [f"db:{d}" for d in {entry["db"], entry["scope"][1]} if d]
+    return keys
+
+
+def _invalidated(entry) -> bool:
+    """
+    True if another process invalidated something this entry depends on after
+    the answer was computed. Without Redis only local invalidation applies.
+    """
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        stamps = client.mget([_REDIS_PREFIX + k for k in _invalidation_keys(entry)])
+    except redis.RedisError as e:
+        mark_failed(e, "Semantic Cache")
+        return False
+    return any(float(t) >= entry["computed_at"] for t in stamps if t)
+
+
+def _publish_invalidation(*keys) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            # older entries have expired everywhere after the TTL
+            pipe.set(_REDIS_PREFIX + key, time.time(), ex=settings.SEMANTIC_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        mark_failed(e, "Semantic Cache")
+
+
+def lookup(vector, scope):
+    """
+    Return (response, similarity) of the closest cached answer in scope whose
+    cosine similarity clears SEMANTIC_CACHE_THRESHOLD, else None.
+    Query vectors are L2-normalised by embed_texts, so the dot product is the cosine.
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    while True:
+        now = time.monotonic()
+        with _lock:
+            for key in [k for k, e in _entries.items() if _expired(e, now)]:
+                del _entries[key]
+                _stats["evictions"] += 1
+
+            key = entry = None
+            keys = [k for k, e in _entries.items() if e["scope"] == scope]
+            if keys:
+                sims = np.stack([_entries[k]["vector"] for k in keys]) @ vector
+                best = int(np.argmax(sims))
+                if sims[best] >= settings.SEMANTIC_CACHE_THRESHOLD:
+                    key, entry, similarity = keys[best], _entries[keys[best]], float(sims[best])
+            if entry is None:
+                _stats["misses"] += 1
+                return None
+
+        # Redis round trip outside the lock; a stale entry is dropped and the
+        # next closest one tried
+        stale = _invalidated(entry)
+        with _lock:
+            if stale:
+                if _entries.pop(key, None) is not None:
+                    _stats["stale"] += 1
+                continue
+            if key in _entries:
+                _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry["response"], similarity
+
+
+def store(vector, scope, response, computed_at: float = None) -> None:
+    """
+    Cache a RAG answer. Responses carrying SQL rows (structured / hybrid) are
+    not stored: questions that differ only in a literal ("customer 17" vs
+    "18") are near-identical vectors but must not share rows.
+
+    computed_at: time.time() when the request started retrieving, so an
+    invalidation that lands while the answer is generated still applies.
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED or response.get("type") != "unstructured":
+        return
+    entry = {
+        "vector": np.asarray(vector, dtype=np.float32),
+        "scope": scope,
+        "response": response,
+        "document_ids": {s.get("document_id") for s in response.get("sources", [])},
+        "db": response.get("db"),
+        "stored_at": time.monotonic(),
+        "computed_at": time.time() if computed_at is None else computed_at,
+    }
+    with _lock:
+        _entries[next(_ids)] = entry
+        _stats["stores"] += 1
+        while len(_entries) > settings.SEMANTIC_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def _invalidate(predicate) -> int:
+    with _lock:
+        keys = [k for k, e in _entries.items() if predicate(e)]
+        for key in keys:
+            del _entries[key]
+        _stats["invalidations"] += len(keys)
+    return len(keys)
+
+
+def invalidate_document(document_id: str) -> int:
+    """
+    Drop answers that cited document_id or were scoped to it, in every process.
+    """
+    _publish_invalidation(f"doc:{document_id}")
+    return _invalidate(lambda e: document_id in e["document_ids"] or e["scope"][2] == document_id)
+
+
+def invalidate_db(db_name: str) -> int:
+    _publish_invalidation(f"db:{db_name}")
+    return _invalidate(lambda e: e["db"] == db_name or e["scope"][1] == db_name)
+
+
+def clear() -> int:
+    _publish_invalidation("all")
+    return _invalidate(lambda e: True)
+
+
+def stats():
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
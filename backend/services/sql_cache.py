@@ -0,0 +1,104 @@
+import hashlib
+import json
+import re
+import threading
+
+import redis
+
+from config import settings
+from .lru import LRUCache
+from .redis_client import get_redis, mark_failed
+
+# Two tiers: per-process LRU in front of the Redis instance Celery already uses.
+_local = LRUCache(settings.SQL_CACHE_MAX_ENTRIES, settings.SQL_CACHE_TTL)
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "redis_errors": 0}
+_stats_lock = threading.Lock()
+
+_REDIS_PREFIX = "querycraft:sql:"
+
+
+def normalize_question(question: str) -> str:
+    # Whitespace and trailing punctuation only: case is kept, since names and
+    # values in a question ("Smith" vs "smith") end up as SQL literals
+    q = re.sub(r"\s+", " ", question.strip())
+    return q.rstrip("?.! ")
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def make_key(question: str, schema_description: str, prompt: str, model: str) -> str:
+    """
+    Exact-match key: normalized question + schema fingerprint + prompt hash + model.
+    A schema or prompt change yields a different key, so stale entries are never read.
+    """
+    schema_hash = hashlib.sha256(schema_description.encode("utf-8")).hexdigest()
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = "\x1f".join([normalize_question(question), schema_hash, prompt_hash, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _redis_failed(e) -> None:
+    _count("redis_errors")
+    mark_failed(e, "SQL Cache")
+
+
+def lookup(key: str):
+    """
+    Return (sql, params) for key, or None on a miss.
+    """
+    if not settings.SQL_CACHE_ENABLED:
+        return None
+    hit = _local.get(key)
+    if hit is not None:
+        _count("local_hits")
+        return hit
+
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = client.get(_REDIS_PREFIX + key)
+        except redis.RedisError as e:
+            _redis_failed(e)
+            raw = None
+        if raw:
+            data = json.loads(raw)
+            hit = (data["sql"], data["params"])
+            _local.set(key, hit)
+            _count("redis_hits")
+            return hit
+
+    _count("misses")
+    return None
+
+
+def store(key: str, sql: str, params) -> None:
+    if not settings.SQL_CACHE_ENABLED:
+        return
+    _local.set(key, (sql, params))
+    _count("stores")
+
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(
+                _REDIS_PREFIX + key,
+                json.dumps({"sql": sql, "params": params}),
+                ex=settings.SQL_CACHE_TTL,
+            )
+        except redis.RedisError as e:
+            _redis_failed(e)
+
+
+def stats():
+    with _stats_lock:
+        counts = dict(_stats)
+    lookups = counts["local_hits"] + counts["redis_hits"] + counts["misses"]
+    hits = counts["local_hits"] + counts["redis_hits"]
+    return {
+        **counts,
+        "local_entries": len(_local),
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -1,16 +1,8 @@
-import os
 import json
 import re
-from openai import OpenAI
-from dotenv import load_dotenv
+from config import settings
 from services.prompt_manager import load_prompts
-
-
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-OPENAI_MODEL = "gpt-4o-mini"
+from services import sql_cache, llm_gateway
 
 
 
@@ -22,27 +14,33 @@ def generate_sql(schema_description, question):
     if not base_prompt:
         raise ValueError("SQL generator prompt not found in prompts.json")
 
-
+    # Identical question + schema + prompt → reuse the earlier (sql, params)
+    cache_key = sql_cache.make_key(question, schema_description, base_prompt, settings.SQL_GENERATOR_MODEL)
+    cached = sql_cache.lookup(cache_key)
+    if cached:
+        return cached
 
     try:
         prompt = base_prompt.format(schema_description=schema_description, question=question)
 
         
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        res = llm_gateway.chat(
+            [{"role": "user", "content": prompt}],
+            model=settings.SQL_GENERATOR_MODEL,
+            purpose="sql_generator",
             max_tokens=300,
             temperature=0
-        )
-
-        res = response.choices[0].message.content.strip()
+        ).strip()
         start, end = res.find("{"), res.rfind("}")
         if start == -1 or end == -1:
             return "", []
 
         try:
             parsed = json.loads(res[start:end+1])
-            return parsed.get("sql", ""), parsed.get("params", [])
+            sql, params = parsed.get("sql", ""), parsed.get("params", [])
+            if sql:
+                sql_cache.store(cache_key, sql, params)
+            return sql, params
         except json.JSONDecodeError:
             return "", []
             
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 import re
 from . import query_runner
 from . import schema_loader
+from . import schema_catalog
 from . import sql_generator
 
 # Load env vars
@@ -84,23 +85,38 @@ def handle_meta_query(question: str, schema_dict: dict):
 
 
 
-def run_nl_sql(query: str, db_config):
+def plan_nl_sql(query: str, db_config):
     """
-    Given a natural language query and a db_config, generate SQL and execute.
+    Resolve a natural language query to SQL without executing it.
+
+    Returns (schema, plan) where plan is either a finished result
+    (meta query / error) or {"sql": ..., "params": ...}.
     """
-    # 1. Extract schema once
-    schema = schema_loader.extract_schema_to_yaml(db_config)
+    # 1. Schema from the process-wide catalog (no introspection on the hot path)
+    schema = schema_catalog.get_schema(db_config)
     schema_desc = schema_loader.schema_to_description(schema)
 
     # 2. Handle meta queries before LLM
     meta = handle_meta_query(query, schema)
     if meta:
-        return meta
+        return schema, meta
 
     # 3. Ask LLM for SQL
     sql, params = sql_generator.generate_sql(schema_desc, query)
     if not sql:
-        return {"error": "Could not generate SQL"}
+        return schema, {"error": "Could not generate SQL"}
+
+    return schema, {"sql": sql, "params": params}
+
+
+def run_nl_sql(query: str, db_config):
+    """
+    Given a natural language query and a db_config, generate SQL and execute.
+    """
+    schema, plan = plan_nl_sql(query, db_config)
+    if "sql" not in plan or plan["sql"] is None:
+        return plan
+    sql, params = plan["sql"], plan["params"]
 
     # 4. Run query
     rows = query_runner.run_query(sql, params, dict(db_config))
@@ -113,3 +129,16 @@ def run_nl_sql(query: str, db_config):
         "params": params,
         "rows": presentable
     }
+
+
+def stream_nl_sql(query: str, db_config, max_rows: int):
+    """
+    Like run_nl_sql, but returns (plan, row_batches) where row_batches is a
+    generator over a server-side cursor (None for meta queries / errors).
+    One extra row is requested so callers can tell whether max_rows truncated the result.
+    """
+    _, plan = plan_nl_sql(query, db_config)
+    if "sql" not in plan or plan["sql"] is None:
+        return plan, None
+    batches = query_runner.stream_query(plan["sql"], plan["params"], dict(db_config), max_rows=max_rows + 1)
+    return plan, batches
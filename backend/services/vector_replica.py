@@ -0,0 +1,515 @@
+"""
+Optional in-process read replica of the Qdrant collection.
+
+Layout in VECTOR_REPLICA_DIR (row i of every file is the same point):
+  vectors.<gen>.f32    N x dim float32 (L2-normalised, as Qdrant stores cosine vectors)
+  ids.<gen>.bin        N x 16 bytes point UUIDs
+  docs.<gen>.u32       document code per row (index into state["documents"])
+  alive.<gen>.u8       1 = live, 0 = tombstoned
+  offsets.<gen>.u64    N x (start, length) of the row's payload in payloads.<gen>.jsonl
+  state.json           generation, row count, dim, document codes, last sync time
+
+Files are append-only except alive (flipped in place) and offsets (patched
+when a payload changes). state.json is replaced atomically after the data is
+written, so readers never see a row before it is complete. Every gunicorn
+worker memory-maps the same files, so the matrix lives once in the page cache.
+
+One process per host writes (sync under an flock); search() is read-only and
+returns None whenever the replica cannot answer (missing, stale, other dim),
+in which case search_chunks asks Qdrant.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import settings
+
+_EXT = {"vectors": "f32", "ids": "bin", "docs": "u32", "alive": "u8", "offsets": "u64", "payloads": "jsonl"}
+_BLOCK_ROWS = 65536  # rows per matmul block (bounds the temporary score array)
+_FETCH_BATCH = 256
+
+_snapshot = None
+_snapshot_key = None
+_snapshot_lock = threading.Lock()
+_sync_thread = None
+
+
+def _path(name: str, generation: int) -> str:
+    return os.path.join(settings.VECTOR_REPLICA_DIR, f"{name}.{generation}.{_EXT[name]}")
+
+
+def _state_path() -> str:
+    return os.path.join(settings.VECTOR_REPLICA_DIR, "state.json")
+
+
+def _read_state():
+    try:
+        with open(_state_path(), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_state(state) -> None:
+    tmp = _state_path() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _state_path())
+
+
+def _map(name, generation, dtype, shape, mode="r"):
+    if not shape[0]:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(_path(name, generation), dtype=dtype, mode=mode, shape=shape)
+
+
+# ---- Read side ----
+
+class _Snapshot:
+    def __init__(self, state):
+        gen, rows, dim = state["generation"], state["rows"], state["dim"]
+        self.state = state
+        self.rows = rows
+        self.dim = dim
+        self.vectors = _map("vectors", gen, np.float32, (rows, dim))
+        self.ids = _map("ids", gen, np.uint8, (rows, 16))
+        self.docs = _map("docs", gen, np.uint32, (rows,))
+        self.alive = _map("alive", gen, np.uint8, (rows,))
+        self.offsets = _map("offsets", gen, np.uint64, (rows, 2))
+        self.payloads = self._map_payloads()
+        self.doc_codes = {doc: code for code, doc in enumerate(state["documents"])}
+
+    def _map_payloads(self):
+        gen = self.state["generation"]
+        size = os.path.getsize(_path("payloads", gen)) if self.rows else 0
+        return _map("payloads", gen, np.uint8, (size,))
+
+    def payload(self, row: int) -> dict:
+        start, length = (int(x) for x in self.offsets[row])
+        if start + length > len(self.payloads):
+            # offset patched by the writer after this snapshot was mapped
+            self.payloads = self._map_payloads()
+        return json.loads(self.payloads[start:start + length].tobytes())
+
+    def point_id(self, row: int) -> str:
+        return str(uuid.UUID(bytes=self.ids[row].tobytes()))
+
+
+def _current():
+    """
+    Snapshot of the latest committed state; re-mapped only when state.json changes.
+    """
+    global _snapshot, _snapshot_key
+    try:
+        st = os.stat(_state_path())
+    except FileNotFoundError:
+        return None
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _snapshot_lock:
+        if key != _snapshot_key:
+            state = _read_state()
+            _snapshot = _Snapshot(state) if state else None
+            _snapshot_key = key
+        return _snapshot
+
+
+def _top_rows(scores, limit):
+    if len(scores) > limit:
+        part = np.argpartition(-scores, limit)[:limit]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part])]
+
+
+def search(query_vector, limit: int = 5, filter_by_doc: str = None, with_vectors: bool = False):
+    """
+    Exact cosine top-k over the memory-mapped matrix, in search_chunks' hit
+    format. None if the replica is disabled, missing, too stale, built for
+    another embedding size or does not know filter_by_doc yet.
+    """
+    if not settings.VECTOR_REPLICA_ENABLED:
+        return None
+    try:
+        return _search(query_vector, limit, filter_by_doc, with_vectors)
+    except Exception as e:
+        # e.g. compaction removed a generation between state.json and the mmap
+        print(f"[Replica] search failed, falling back to Qdrant: {e}")
+        return None
+
+
+def _search(query_vector, limit, filter_by_doc, with_vectors):
+    snap = _current()
+    if snap is None or time.time() - snap.state.get("synced_at", 0) > settings.VECTOR_REPLICA_MAX_LAG:
+        return None
+    q = np.asarray(query_vector, dtype=np.float32)
+    if q.shape != (snap.dim,):
+        return None
+    q = q / (np.linalg.norm(q) + 1e-12)
+
+    if filter_by_doc:
+        code = snap.doc_codes.get(filter_by_doc)
+        if code is None:
+            return None  # not synced yet (e.g. just processed): let Qdrant answer
+        rows = np.flatnonzero((snap.docs == code) & (snap.alive == 1))
+        scores = snap.vectors[rows] @ q
+        order = _top_rows(scores, limit)
+        best_rows, best_scores = rows[order], scores[order]
+    else:
+        cand_rows, cand_scores = [], []
+        for start in range(0, snap.rows, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, snap.rows)
+            scores = snap.vectors[start:end] @ q
+            scores[snap.alive[start:end] == 0] = -np.inf
+            top = _top_rows(scores, limit)
+            cand_rows.append(top + start)
+            cand_scores.append(scores[top])
+        if not cand_rows:
+            return []
+        rows, scores = np.concatenate(cand_rows), np.concatenate(cand_scores)
+        order = _top_rows(scores, limit)
+        best_rows, best_scores = rows[order], scores[order]
+
+    hits = []
+    for row, score in zip(best_rows, best_scores):
+        if not np.isfinite(score):
+            continue
+        hit = {"id": snap.point_id(int(row)), "score": float(score), "payload": snap.payload(int(row))}
+        if with_vectors:
+            hit["vector"] = snap.vectors[int(row)].tolist()
+        hits.append(hit)
+    return hits
+
+
+# ---- Write side (sync from Qdrant) ----
+
+@contextmanager
+def _writer_lock(blocking: bool = True):
+    os.makedirs(settings.VECTOR_REPLICA_DIR, exist_ok=True)
+    with open(os.path.join(settings.VECTOR_REPLICA_DIR, "lock"), "a+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _Writer:
+    """
+    Appends / tombstones rows of the current generation. Only used while
+    holding the writer lock; commit() publishes the new state to readers.
+    """
+
+    def __init__(self, dim: int):
+        state = _read_state()
+        if state is None or state["dim"] != dim or state.get("collection") != settings.COLLECTION_NAME:
+            generation = (state["generation"] + 1) if state else 0
+            for name in _EXT:
+                open(_path(name, generation), "wb").close()
+                if state:  # replica of another collection / model: start over
+                    os.remove(_path(name, state["generation"]))
+            state = {"generation": generation, "rows": 0, "dim": dim, "documents": [],
+                     "collection": settings.COLLECTION_NAME, "synced_at": 0}
+        self.state = state
+        gen, rows = state["generation"], state["rows"]
+        self.doc_codes = {doc: code for code, doc in enumerate(state["documents"])}
+        ids = _map("ids", gen, np.uint8, (rows, 16))
+        self.rows_by_id = {bytes(ids[i]): i for i in range(rows)}
+        self.docs = np.array(_map("docs", gen, np.uint32, (rows,)))
+        self.alive = np.array(_map("alive", gen, np.uint8, (rows,)))
+        self.dead = []       # rows to tombstone on commit
+        self.patches = {}    # row -> new payload
+
+    def rows_of(self, document_id):
+        code = self.doc_codes.get(document_id)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero((self.docs == code) & (self.alive == 1))
+
+    def alive_counts(self):
+        codes, counts = np.unique(self.docs[self.alive == 1], return_counts=True)
+        docs = self.state["documents"]
+        return {docs[c]: int(n) for c, n in zip(codes, counts)}
+
+    def live_row(self, point_id: str):
+        row = self.rows_by_id.get(uuid.UUID(point_id).bytes)
+        return row if row is not None and self.alive[row] else None
+
+    def append(self, points) -> None:
+        if not points:
+            return
+        gen = self.state["generation"]
+        codes = []
+        for p in points:
+            doc = p.payload.get("document_id")
+            if doc not in self.doc_codes:
+                self.doc_codes[doc] = len(self.state["documents"])
+                self.state["documents"].append(doc)
+            codes.append(self.doc_codes[doc])
+
+        # a re-appended id supersedes its old row
+        self.dead.extend(r for r in (self.rows_by_id.get(uuid.UUID(str(p.id)).bytes) for p in points) if r is not None)
+
+        lines = [json.dumps(p.payload, ensure_ascii=False).encode("utf-8") + b"\n" for p in points]
+        with open(_path("payloads", gen), "ab") as f:
+            start = f.tell()
+            f.writelines(lines)
+        offsets = np.empty((len(lines), 2), dtype=np.uint64)
+        for i, line in enumerate(lines):
+            offsets[i] = (start, len(line) - 1)
+            start += len(line)
+
+        vectors = np.asarray([p.vector for p in points], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        ids = b"".join(uuid.UUID(str(p.id)).bytes for p in points)
+        for name, raw in (
+            ("vectors", vectors.tobytes()), ("ids", ids),
+            ("docs", np.asarray(codes, dtype=np.uint32).tobytes()),
+            ("alive", np.ones(len(points), dtype=np.uint8).tobytes()),
+            ("offsets", offsets.tobytes()),
+        ):
+            with open(_path(name, gen), "ab") as f:
+                f.write(raw)
+
+        first = self.state["rows"]
+        for i, p in enumerate(points):
+            self.rows_by_id[uuid.UUID(str(p.id)).bytes] = first + i
+        self.docs = np.concatenate([self.docs, np.asarray(codes, dtype=np.uint32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(points), dtype=np.uint8)])
+        self.state["rows"] = first + len(points)
+
+    def commit(self, synced: bool = True) -> None:
+        gen, rows = self.state["generation"], self.state["rows"]
+        if self.dead or self.patches:
+            alive = _map("alive", gen, np.uint8, (rows,), mode="r+")
+            alive[self.dead] = 0
+            alive.flush()
+            self.alive[self.dead] = 0
+        if self.patches:
+            with open(_path("payloads", gen), "ab") as f:
+                start = f.tell()
+                for row, payload in self.patches.items():
+                    line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+                    f.write(line)
+                    self.patches[row] = (start, len(line) - 1)
+                    start += len(line)
+            offsets = _map("offsets", gen, np.uint64, (rows, 2), mode="r+")
+            for row, span in self.patches.items():
+                offsets[row] = span
+            offsets.flush()
+        self.dead, self.patches = [], {}
+        if synced:
+            self.state["synced_at"] = time.time()
+        _write_state(self.state)
+
+    def compact(self) -> bool:
+        """
+        Rewrite live rows into a new generation once tombstones pass
+        VECTOR_REPLICA_COMPACT_RATIO. Readers keep their old mappings until
+        they see the new state.json.
+        """
+        rows = self.state["rows"]
+        live = np.flatnonzero(self.alive == 1)
+        if not rows or (rows - len(live)) / rows < settings.VECTOR_REPLICA_COMPACT_RATIO:
+            return False
+        old = _Snapshot(self.state)
+        gen = self.state["generation"] + 1
+        with open(_path("vectors", gen), "wb") as f:
+            for s in range(0, len(live), _BLOCK_ROWS):
+                f.write(np.ascontiguousarray(old.vectors[live[s:s + _BLOCK_ROWS]]).tobytes())
+        with open(_path("ids", gen), "wb") as f:
+            f.write(np.ascontiguousarray(old.ids[live]).tobytes())
+        with open(_path("docs", gen), "wb") as f:
+            f.write(np.ascontiguousarray(old.docs[live]).tobytes())
+        with open(_path("alive", gen), "wb") as f:
+            f.write(np.ones(len(live), dtype=np.uint8).tobytes())
+        offsets = np.empty((len(live), 2), dtype=np.uint64)
+        with open(_path("payloads", gen), "wb") as f:
+            for i, row in enumerate(live):
+                start, length = (int(x) for x in old.offsets[row])
+                offsets[i] = (f.tell(), length)
+                f.write(old.payloads[start:start + length].tobytes() + b"\n")
+        with open(_path("offsets", gen), "wb") as f:
+            f.write(offsets.tobytes())
+
+        previous = self.state["generation"]
+        self.state.update(generation=gen, rows=len(live))
+        self.rows_by_id = {bytes(old.ids[r]): i for i, r in enumerate(live)}
+        self.docs = np.array(old.docs[live])
+        self.alive = np.ones(len(live), dtype=np.uint8)
+        self.commit()
+        for name in _EXT:  # open mappings of the old files stay valid after unlink
+            os.remove(_path(name, previous))
+        return True
+
+
+def _scan(client, document_id=None):
+    """
+    {point_id: chunk_index} for the collection or one document (no vectors or text).
+    """
+    from .qdrant_store import _doc_filter
+
+    found = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            settings.COLLECTION_NAME,
+            scroll_filter=_doc_filter(document_id) if document_id else None,
+            with_payload=["document_id", "chunk_index"],
+            with_vectors=False,
+            limit=4096,
+            offset=offset,
+        )
+        for p in points:
+            found[str(p.id)] = (p.payload or {}).get("chunk_index")
+        if offset is None:
+            return found
+
+
+def _apply(writer: _Writer, client, expected, scope_rows, patch_payloads: bool):
+    """
+    Make the replica rows in scope_rows match expected {point_id: chunk_index}:
+    tombstone vanished points, fetch + append new ones and (optionally)
+    re-number kept chunks whose index moved.
+    """
+    stats = {"added": 0, "removed": 0, "renumbered": 0}
+    snap = _Snapshot(writer.state) if patch_payloads and writer.state["rows"] else None
+    expected_rows = {}
+    missing = []
+    for point_id, chunk_index in expected.items():
+        row = writer.live_row(point_id)
+        if row is None:
+            missing.append(point_id)
+        else:
+            expected_rows[row] = chunk_index
+
+    gone = [int(r) for r in scope_rows if int(r) not in expected_rows]
+    writer.dead.extend(gone)
+    stats["removed"] = len(gone)
+
+    if snap is not None:
+        for row, chunk_index in expected_rows.items():
+            payload = snap.payload(row)
+            if payload.get("chunk_index") != chunk_index:
+                writer.patches[row] = {**payload, "chunk_index": chunk_index}
+        stats["renumbered"] = len(writer.patches)
+
+    for s in range(0, len(missing), _FETCH_BATCH):
+        points = client.retrieve(
+            settings.COLLECTION_NAME, ids=missing[s:s + _FETCH_BATCH], with_payload=True, with_vectors=True,
+        )
+        writer.append(points)
+        stats["added"] += len(points)
+    return stats
+
+
+def tombstone(documents) -> bool:
+    """
+    Hide the rows of deleted documents right away, without talking to Qdrant.
+    Never blocks: False if the replica is empty or a sync holds the lock
+    (that sync, or the next one, drops the rows instead).
+    """
+    state = _read_state()
+    if not state or not state["rows"] or state.get("collection") != settings.COLLECTION_NAME:
+        return False
+    with _writer_lock(blocking=False) as acquired:
+        if not acquired:
+            return False
+        writer = _Writer(state["dim"])
+        for document_id in documents:
+            writer.dead.extend(int(r) for r in writer.rows_of(document_id))
+        writer.commit(synced=False)
+        return True
+
+
+def sync(client, dim: int, full: bool = False, documents=None, blocking: bool = False):
+    """
+    Bring the replica up to date with Qdrant; returns a stats dict, or None
+    if another process is already syncing (non-blocking).
+
+    - documents: re-sync just these document ids
+    - default:   one facet request finds documents whose point count differs
+                 from the replica, and only those are re-synced
+    - full:      diff every point id (catches same-size re-indexes)
+    """
+    from .qdrant_store import document_point_counts
+
+    with _writer_lock(blocking=blocking) as acquired:
+        if not acquired:
+            return None
+        started = time.perf_counter()
+        writer = _Writer(dim)
+        totals = {"added": 0, "removed": 0, "renumbered": 0, "documents": 0}
+
+        if full or not writer.state["rows"]:
+            stats = _apply(writer, client, _scan(client), np.flatnonzero(writer.alive == 1), False)
+            totals.update(stats, documents=len(writer.state["documents"]))
+        else:
+            if documents is None:
+                remote = document_point_counts(client, settings.COLLECTION_NAME)
+                local = writer.alive_counts()
+                documents = [d for d in set(remote) | set(local) if remote.get(d) != local.get(d)]
+            for document_id in documents:
+                stats = _apply(writer, client, _scan(client, document_id), writer.rows_of(document_id), True)
+                for k, v in stats.items():
+                    totals[k] += v
+                writer.commit()  # publish per document
+            totals["documents"] = len(documents)
+
+        writer.commit()
+        totals["compacted"] = writer.compact()
+        totals["rows"] = writer.state["rows"]
+        totals["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return totals
+
+
+def start_sync_thread(get_client, dim_fn) -> None:
+    """
+    Background sync loop for the API process: an incremental sync every
+    VECTOR_REPLICA_SYNC_INTERVAL seconds and a full id diff every
+    VECTOR_REPLICA_FULL_SYNC_EVERY rounds. Only one process per host
+    actually syncs each round (the others find the lock taken).
+    """
+    global _sync_thread
+
+    def loop():
+        rounds = 0
+        while True:
+            try:
+                stats = sync(get_client(), dim_fn(), full=rounds % settings.VECTOR_REPLICA_FULL_SYNC_EVERY == 0)
+                if stats and (stats["added"] or stats["removed"] or stats["renumbered"]):
+                    print(f"[Vector Replica] sync: {stats}")
+            except Exception as e:
+                print(f"[Vector Replica] sync failed: {e}")
+            rounds += 1
+            time.sleep(settings.VECTOR_REPLICA_SYNC_INTERVAL)
+
+    if _sync_thread is None or not _sync_thread.is_alive():
+        _sync_thread = threading.Thread(target=loop, name="vector-replica-sync", daemon=True)
+        _sync_thread.start()
+
+
+def stats():
+    snap = _current()
+    if snap is None:
+        return {"enabled": settings.VECTOR_REPLICA_ENABLED, "rows": 0}
+    live = int(np.count_nonzero(snap.alive))
+    return {
+        "enabled": settings.VECTOR_REPLICA_ENABLED,
+        "rows": snap.rows,
+        "live_rows": live,
+        "documents": len(snap.state["documents"]),
+        "generation": snap.state["generation"],
+        "lag_s": round(time.time() - snap.state.get("synced_at", 0), 1),
+    }
@@ -1,49 +1,239 @@
 import io
-from celery import shared_task
+import os
+import time
+from itertools import islice
+import numpy as np
+from celery import chord, group
 from sqlalchemy.orm import Session
 
 from config import settings
 from celery_app import celery_app
-from s3_client import get_object_stream
-from services.ingest import extract_text_from_pdf_stream
-from services.chunk_embed import chunk_text, embed_texts
-from services.qdrant_store import get_qdrant_client, upsert_chunks
+from s3_client import get_object_stream, head_etag
+from services.ingest import spool_stream, get_extractor
+from services.chunk_embed import iter_chunks, embed_texts
+from services.reindex import DocumentIndexer
+from services.qdrant_store import chunk_point_id, existing_chunk_indexes
+from services import resources, document_catalog, ingest_artifacts, semantic_cache
 from db import Documents, SessionLocal
 
 
-@celery_app.task(name="process_document_task")
-def process_document_task(record_id: str, document_id: str, s3_key: str, filename: str) -> None:
+def _batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _ms_since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _ingest_failed(document_id: str, prefix: str = None) -> None:
     db: Session = SessionLocal()
     try:
-        # Stream file from S3
-        body = get_object_stream(settings.S3_BUCKET, s3_key)
-        # NOTE: Support only PDF stream path here; fall back to temp-file for other types if needed
-        text = extract_text_from_pdf_stream(body)
-
-        # Chunk + embed
-        chunks = chunk_text(text)
-        vectors = embed_texts(chunks, settings.EMBED_MODEL)
-
-        # Upsert into Qdrant
-        qdrant = get_qdrant_client(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=30.0)
-        from services.chunk_embed import embedding_dim  # ensure collection exists if needed
-        from services.qdrant_store import ensure_collection
-        ensure_collection(qdrant, settings.COLLECTION_NAME, embedding_dim(settings.EMBED_MODEL))
-        upsert_chunks(qdrant, settings.COLLECTION_NAME, vectors, chunks, document_id, filename)
-
-        # Update DB status
         rec = db.get(Documents, document_id)
         if rec:
-            rec.status = "processed"
-            rec.chunks = len(chunks)
+            rec.status = "error"
         db.commit()
-    except Exception as e:
+    finally:
+        db.close()
+    if prefix:
+        try:
+            ingest_artifacts.delete(prefix)
+        except Exception as e:
+            print(f"[Ingest] {document_id}: artifacts under {prefix} not deleted: {e}")
+
+
+class _IngestStage(celery_app.Task):
+    """
+    Base for the ingestion stages. Failures are retried with exponential
+    backoff; each stage skips work whose artifact already exists, so a retry
+    resumes where the previous attempt stopped. ValueError (e.g. unsupported
+    file type) is permanent and not retried.
+    """
+    autoretry_for = (Exception,)
+    dont_autoretry_for = (ValueError,)
+    retry_backoff = True
+    retry_backoff_max = 300
+    max_retries = 3
+    acks_late = True  # a worker crash mid-stage redelivers the stage, not the document
+
+
+class _ExtractStage(_IngestStage):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        # Only called once retries are exhausted (or the error is permanent);
+        # the later stages report through ingest_failed_task instead
+        _, document_id, s3_key, _ = args
+        try:
+            prefix = ingest_artifacts.artifact_prefix(document_id, head_etag(settings.S3_BUCKET, s3_key))
+        except Exception:
+            prefix = None  # source object gone: nothing was checkpointed for it
+        _ingest_failed(document_id, prefix)
+
+
+# Ingestion runs as three stages on separate queues (see task_routes in
+# celery_app and run_worker.py):
+#   process_document_task  (extract) download, extract, chunk → chunk batches in S3
+#   embed_batch_task       (embed)   one task per batch with new chunks → vectors in S3
+#   index_document_task    (index)   chord callback: diff + upsert into Qdrant
+# process_document_task keeps its name and signature, so /upload-doc and the
+# /upload-docs group enqueue the pipeline unchanged.
+
+@celery_app.task(name="process_document_task", base=_ExtractStage, bind=True)
+def process_document_task(self, record_id: str, document_id: str, s3_key: str, filename: str):
+    started = time.perf_counter()
+    # Pick the extractor up front so unsupported formats fail before any download
+    extract = get_extractor(filename)
+    prefix = ingest_artifacts.artifact_prefix(document_id, head_etag(settings.S3_BUCKET, s3_key))
+
+    db: Session = SessionLocal()
+    try:
         rec = db.get(Documents, document_id)
         if rec:
-            rec.status = "error"
+            rec.status = "processing"
+            rec.chunks = 0
         db.commit()
-        raise
     finally:
         db.close()
 
+    manifest = ingest_artifacts.get_manifest(prefix)
+    if manifest is None:
+        # Chunks already stored for document_id (same content-addressed point id)
+        # are marked as kept, so a re-upload only embeds new chunks
+        stored = set(existing_chunk_indexes(resources.get_qdrant_client(), settings.COLLECTION_NAME, document_id))
+        seen = set()
+
+        # Spool the S3 object to disk so pages can be read lazily; chunk batches
+        # are checkpointed as they are produced, the manifest marks completion
+        path = spool_stream(
+            get_object_stream(settings.S3_BUCKET, s3_key), suffix=os.path.splitext(filename)[1].lower()
+        )
+        try:
+            batches = chunks_total = 0
+            to_embed = []
+            for chunks in _batched(iter_chunks(extract(path)), settings.EMBED_BATCH_SIZE):
+                new = []
+                for j, text in enumerate(chunks):
+                    pid = chunk_point_id(document_id, text)
+                    if pid not in stored and pid not in seen:
+                        new.append(j)
+                    seen.add(pid)
+                ingest_artifacts.put_chunks(prefix, batches, chunks, new)
+                if new:
+                    to_embed.append(batches)
+                batches += 1
+                chunks_total += len(chunks)
+        finally:
+            os.remove(path)
+        manifest = {"document_id": document_id, "filename": filename,
+                    "batches": batches, "chunks": chunks_total, "embed": to_embed}
+        ingest_artifacts.put_manifest(prefix, manifest)
+    print(f"[Ingest] {document_id}: extracted {manifest['chunks']} chunks in {manifest['batches']} batches, "
+          f"{len(manifest['embed'])} to embed ({_ms_since(started)} ms)")
+
+    index = index_document_task.si(document_id, prefix, filename)
+    index.link_error(ingest_failed_task.si(document_id, prefix))
+    if not manifest["embed"]:
+        return self.replace(index)  # nothing new: only renumbering / stale points to delete
+    embed = group(embed_batch_task.si(prefix, i) for i in manifest["embed"])
+    return self.replace(chord(embed, index))
+
+
+@celery_app.task(name="embed_batch_task", base=_IngestStage)
+def embed_batch_task(prefix: str, batch_no: int) -> int:
+    chunks, new = ingest_artifacts.get_chunks(prefix, batch_no)
+    if not ingest_artifacts.has_vectors(prefix, batch_no):
+        ingest_artifacts.put_vectors(prefix, batch_no, embed_texts([chunks[j] for j in new], settings.EMBED_MODEL))
+    return len(new)
+
 
+def _lookup_vectors(texts, vectors: dict):
+    missing = [t for t in texts if t not in vectors]
+    if missing:
+        # only if the document's points changed between the extract and index stages
+        print(f"[Ingest] embedding {len(missing)} chunks in the index stage")
+        vectors = {**vectors, **dict(zip(missing, embed_texts(missing, settings.EMBED_MODEL)))}
+    return np.stack([vectors[t] for t in texts])
+
+
+@celery_app.task(name="index_document_task", base=_IngestStage)
+def index_document_task(document_id: str, prefix: str, filename: str) -> dict:
+    started = time.perf_counter()
+    manifest = ingest_artifacts.get_manifest(prefix)
+    embedded = set(manifest["embed"])
+    # The vector size comes from the embed stage's output, so index workers
+    # never load the embedding model; with nothing new to embed, every chunk
+    # is already stored (or the document is empty) and the collection exists.
+    if embedded:
+        dim = ingest_artifacts.get_vectors(prefix, manifest["embed"][0]).shape[1]
+        qdrant = resources.get_qdrant(dim)
+    else:
+        qdrant = resources.get_qdrant_client()
+
+    db: Session = SessionLocal()
+    try:
+        rec = db.get(Documents, document_id)
+
+        # The indexer diffs against points already stored for document_id: only
+        # new chunks are upserted (with the vectors from the embed stage) and
+        # vanished ones deleted. Upserts are idempotent, so a retry is safe.
+        indexer = DocumentIndexer(qdrant, settings.COLLECTION_NAME, document_id, filename)
+        for i in range(manifest["batches"]):
+            chunks, new = ingest_artifacts.get_chunks(prefix, i)
+            vectors = {}
+            if i in embedded:
+                vectors = dict(zip((chunks[j] for j in new), ingest_artifacts.get_vectors(prefix, i)))
+            indexer.add_batch(chunks, lambda texts: _lookup_vectors(texts, vectors))
+
+            # Record progress
+            if rec:
+                rec.chunks = indexer.points
+            db.commit()
+        stats = indexer.finish()
+
+        if rec:
+            rec.status = "processed"
+            rec.chunks = indexer.points
+        db.commit()
+    finally:
+        db.close()
+
+    # Answers built from the document's old chunks while it was re-indexed
+    semantic_cache.invalidate_document(document_id)
+    ingest_artifacts.delete(prefix)
+    timings = {"index_ms": _ms_since(started)}
+    print(f"[Ingest] {document_id}: {stats} {timings}")
+    return {"document_id": document_id, **stats, "timings": timings}
+
+
+@celery_app.task(name="ingest_failed_task")
+def ingest_failed_task(document_id: str, prefix: str) -> None:
+    """
+    Error callback of the index stage; Celery also calls it when any embed
+    task of the chord fails for good. Marks the document "error" and drops
+    its artifacts.
+    """
+    _ingest_failed(document_id, prefix)
+
+
+@celery_app.task(name="reconcile_documents_task")
+def reconcile_documents_task(delete_orphans: bool = None) -> dict:
+    """
+    Periodic consistency check between public.documents and the Qdrant
+    collection (see document_catalog.reconcile); scheduled by celery beat.
+    """
+    if delete_orphans is None:
+        delete_orphans = settings.RECONCILE_DELETE_ORPHANS
+    db: Session = SessionLocal()
+    try:
+        report = document_catalog.reconcile(db, resources.get_qdrant(), delete_orphans=delete_orphans)
+    finally:
+        db.close()
+    print(
+        f"[Reconcile] {report['documents']} documents, {report['points']} points: "
+        f"{len(report['corrected'])} corrected, {len(report['missing'])} missing, "
+        f"{len(report['orphans'])} orphaned"
+    )
+    return report
@@ -8,6 +8,12 @@ interface Document {
   uploaded_at?: string
 }
 
+interface DocumentItem {
+  document_id: string
+  filename?: string | null
+  created_at?: string | null
+}
+
 export default function ListDocsPage() {
   const [docs, setDocs] = useState<Document[]>([])
   const [loading, setLoading] = useState(false)
@@ -18,14 +24,23 @@ export default function ListDocsPage() {
     setError('')
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL;
-      const res = await fetch(`${apiUrl}/list-docs`)
-      const data = await res.json()
-      if (!res.ok) throw new Error(data.error || 'Failed to fetch documents')
-      setDocs((data.documents || []).map((doc: string) => ({
-        document_id: doc,
-        name: doc,
-        uploaded_at: '-'
-      })))
+      // /list-docs is paginated: follow next_cursor until the last page
+      const all: Document[] = []
+      let cursor: string | null = null
+      do {
+        const params = new URLSearchParams({ status: 'processed' })
+        if (cursor) params.set('cursor', cursor)
+        const res = await fetch(`${apiUrl}/list-docs?${params}`)
+        const data = await res.json()
+        if (!res.ok) throw new Error(data.error || 'Failed to fetch documents')
+        all.push(...(data.items || []).map((item: DocumentItem) => ({
+          document_id: item.document_id,
+          name: item.filename || item.document_id,
+          uploaded_at: item.created_at ? new Date(item.created_at).toLocaleString() : '-'
+        })))
+        cursor = data.next_cursor || null
+      } while (cursor)
+      setDocs(all)
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred')
     } finally {